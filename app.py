@@ -2,12 +2,16 @@
 # streamlit run app.py
 
 import os  # Importer os pour manipuler les répertoires
+import time
 import streamlit as st
-from utils.file_handlers import select_pdf_source
-from utils.pdf_preprocessing import extract_text_from_pdf
+from utils.file_handlers import MAX_FILE_SIZE, save_upload, select_pdf_source
+from utils.pdf_preprocessing import EXTRACTION_WORKERS
+from utils.jobs import get_job_queue, FAILED, QUEUED, RUNNING, UI_POLL_INTERVAL
+from utils.extraction_cache import get_extraction_cache
+from utils.instrumentation import render_debug_panel
 
-# Définir la taille maximale du fichier PDF en octets (par exemple 10 Mo)
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+# Nombre de pages affichées dans l'interface (l'extraction porte sur tout le document)
+MAX_DISPLAYED_PAGES = 20
 
 # Configuration de la page Streamlit
 st.set_page_config(page_title="Educational PDF App", layout="wide")
@@ -18,36 +22,54 @@ st.title("📘 Générateur de contenu PDF éducatif")
 with st.sidebar:
     st.header("📂 Source PDF")
     uploaded_file = st.file_uploader("Télécharger un fichier PDF", type="pdf")
+    # Nombre de processus utilisés pour extraire les pages en parallèle
+    workers = st.number_input("Processus d'extraction", min_value=1, max_value=os.cpu_count() or 1,
+                              value=min(EXTRACTION_WORKERS, os.cpu_count() or 1))
+    # Mesures de performance (durées par étape, pages OCR, tokens...) des derniers documents
+    if st.checkbox("Afficher les mesures", value=False):
+        render_debug_panel()
 
 # Vérifier si un fichier a été téléchargé
 if uploaded_file:
     # Vérifier la taille du fichier
     if uploaded_file.size > MAX_FILE_SIZE:
-        st.error(f"Le fichier est trop volumineux. La taille maximale est de {MAX_FILE_SIZE / (1024 * 1024)} Mo.")
+        st.error(f"Le fichier est trop volumineux. La taille maximale est de {MAX_FILE_SIZE / (1024 * 1024):.0f} Mo.")
     else:
-        # Créer le répertoire temp_files s'il n'existe pas déjà
-        temp_dir = "./temp_files"
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-
-        # Sauvegarder le fichier téléchargé dans un chemin temporaire
-        pdf_path = os.path.join(temp_dir, uploaded_file.name)
-        with open(pdf_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # Copie du fichier dans le dossier de la session (par blocs)
+        pdf_path = save_upload(uploaded_file)
 
         st.success(f"✅ PDF chargé avec succès !")
         
         # Affichage du bouton d'extraction du texte
+        # L'extraction tourne en arrière-plan : l'interface suit le travail à chaque rerun
+        jobs = st.session_state.setdefault("jobs", {})
         if st.button("📤 Extraire le texte"):
-            with st.spinner("Extraction du texte en cours..."):
-                # Appeler la fonction pour extraire le texte
-                pages = extract_text_from_pdf(pdf_path)
+            jobs[pdf_path] = get_job_queue().submit("pages", pdf_path, workers=workers)
+
+        job = get_job_queue().get(jobs[pdf_path]) if pdf_path in jobs else None
+        if job:
+            running = job["status"] in (QUEUED, RUNNING)
+            if running:
+                page_count = job["progress_total"] or 1
+                st.progress(job["progress_done"] / page_count,
+                            text=f"Extraction du texte en cours... page {job['progress_done']} / {job['progress_total']}")
+            elif job["status"] == FAILED:
+                st.error(f"Erreur lors de l'extraction : {job['error']}")
+            else:
+                st.success("✅ Extraction terminée.")
 
-            st.success("✅ Extraction terminée.")
+                # Statistiques du cache d'extraction (succès / échecs depuis le démarrage)
+                cache_stats = get_extraction_cache().stats()
+                st.caption(f"Cache : {cache_stats['hits']} succès, {cache_stats['misses']} échecs ({cache_stats['hit_rate']:.0%})")
 
-            for i, page in enumerate(pages[:20]):  # Afficher les 3 premières pages
+            # Chaque page est affichée dès qu'elle est extraite
+            for i, page in enumerate(job["items"][:MAX_DISPLAYED_PAGES]):
                 with st.expander(f"Page {i+1}"):
                     st.text(page)
+
+            if running:
+                time.sleep(UI_POLL_INTERVAL)
+                st.rerun()
 else:
     st.info("Veuillez importer un fichier PDF à partir de la barre de gauche pour commencer.")
 
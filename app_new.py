@@ -1,80 +1,7 @@
-import os  # Pour manipuler les répertoires
+import time
 import streamlit as st
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
-import fitz  # PyMuPDF
-
-# Configuration du client Azure pour GPT-4
-endpoint = "https://models.github.ai/inference"
-model = "openai/gpt-4.1"
-token = os.getenv("GITHUB_TOKEN")  # Il faut assurer que le github token est dans les variables d'environnement
-
-client = ChatCompletionsClient(
-    endpoint=endpoint,
-    credential=AzureKeyCredential(token),
-)
-
-# Définir la taille maximale du fichier PDF en octets (par exemple 10 Mo)
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
-
-# Fonction pour extraire le texte et les images du PDF
-def extract_text_images(pdf_path):
-    doc = fitz.open(pdf_path)
-    full_text = ""
-    images = []
-
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        full_text += page.get_text("text") + "\n"
-
-        img_list = page.get_images(full=True)
-        for img_index, img in enumerate(img_list):
-            xref = img[0]
-            pix = fitz.Pixmap(doc, xref)
-            if pix.n < 5:  # C'est du GRAY ou RGB
-                img_path = f"temp_files/image_page{page_num+1}_{img_index+1}.png"
-                pix.save(img_path)
-                images.append(img_path)
-            pix = None
-
-    return full_text, images
-
-# Fonction pour demander au modèle GPT de structurer le contenu
-def ask_gpt_for_structure(content):
-    prompt = f"""
-    Tu es un assistant pédagogique intelligent. Voici le contenu d'un cours en PDF :
-
-    {content}
-
-    Découpe ce document en : Introduction, Notion 1, Notion 2, ..., Conclusion.
-    Pour chaque section :
-    - Donne un titre
-    - Résume en 3-5 lignes
-    - Identifie si des images, tableaux ou équations y sont liées
-    - Structure bien la réponse en JSON comme suit :
-    [
-      {{
-        "section": "Introduction",
-        "summary": "...",
-        "related_elements": ["image_page1_1.png", "eq_1.png"]
-      }},
-      ...
-    ]
-    """
-
-    # Interagir avec le LLM via Azure API
-    response = client.complete(
-        messages=[
-            SystemMessage("Tu es un expert en pédagogie et structure de contenu éducatif."),
-            UserMessage(prompt),
-        ],
-        temperature=0.3,  # Contrôle de la créativité du modèle
-        top_p=1.0,  # Contrôle de la diversité
-        model=model
-    )
-
-    return response.choices[0].message.content
+from utils.file_handlers import MAX_FILE_SIZE, save_upload
+from utils.jobs import get_job_queue, FAILED, QUEUED, RUNNING, UI_POLL_INTERVAL
 
 # Configuration de la page Streamlit
 st.set_page_config(page_title="Educational PDF App", layout="wide")
@@ -90,33 +17,32 @@ with st.sidebar:
 if uploaded_file:
     # Vérifier la taille du fichier
     if uploaded_file.size > MAX_FILE_SIZE:
-        st.error(f"Le fichier est trop volumineux. La taille maximale est de {MAX_FILE_SIZE / (1024 * 1024)} Mo.")
+        st.error(f"Le fichier est trop volumineux. La taille maximale est de {MAX_FILE_SIZE / (1024 * 1024):.0f} Mo.")
     else:
-        # Créer le répertoire temp_files s'il n'existe pas déjà
-        temp_dir = "./temp_files"
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-
-        # Sauvegarder le fichier téléchargé dans un chemin temporaire
-        pdf_path = os.path.join(temp_dir, uploaded_file.name)
-        with open(pdf_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # Copie du fichier dans le dossier de la session (par blocs)
+        pdf_path = save_upload(uploaded_file)
 
         st.success(f"✅ PDF chargé avec succès !")
 
-        # Affichage du bouton d'extraction du texte
+        # L'extraction et la structuration tournent en arrière-plan : l'interface
+        # suit le travail à chaque rerun
+        jobs = st.session_state.setdefault("jobs", {})
         if st.button("📤 Extraire le texte et structurer avec GPT-4"):
-            with st.spinner("Extraction et structuration du texte en cours..."):
-                # Extraire le texte et les images du PDF
-                full_text, image_paths = extract_text_images(pdf_path)
-
-                # Demander à GPT-4 de structurer le contenu du PDF
-                structured_content = ask_gpt_for_structure(full_text)
-
-            st.success("✅ Extraction et structuration terminées.")
-
-            # Afficher les résultats structurés
-            st.json(structured_content)
+            jobs[pdf_path] = get_job_queue().submit("structure", pdf_path, prompt="structure", with_tables=False)
+
+        job = get_job_queue().get(jobs[pdf_path]) if pdf_path in jobs else None
+        if job:
+            if job["status"] in (QUEUED, RUNNING):
+                st.info("Extraction et structuration du texte en cours...")
+                time.sleep(UI_POLL_INTERVAL)
+                st.rerun()
+            elif job["status"] == FAILED:
+                st.error(f"Erreur lors de l'extraction : {job['error']}")
+            else:
+                st.success("✅ Extraction et structuration terminées.")
+
+                # Afficher les résultats structurés
+                st.json(job["result"]["sections"])
 
 else:
     st.info("Veuillez importer un fichier PDF à partir de la barre de gauche pour commencer.")
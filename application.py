@@ -1,112 +1,65 @@
 import os
+import time
 import streamlit as st
-from azure.ai.inference import ChatCompletionsClient
-from azure.ai.inference.models import SystemMessage, UserMessage
-from azure.core.credentials import AzureKeyCredential
-import fitz  # PyMuPDF
-import pdfplumber  # Pour extraire les tableaux en format PDF
-import csv  # Pour sauvegarder les tableaux en CSV
-import json
-import ast
-
-# Configuration du client Azure pour GPT-4
-endpoint = "https://models.github.ai/inference"
-model = "openai/gpt-4.1"
-token = os.getenv("GITHUB_TOKEN")  # Il faut assurer que le github token est dans les variables d'environnement
-
-client = ChatCompletionsClient(
-    endpoint=endpoint,
-    credential=AzureKeyCredential(token),
-)
-
-# Définir la taille maximale du fichier PDF en octets (par exemple 10 Mo)
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
-
-# Fonction pour extraire le texte, les images, les tableaux et les formules du PDF
-def extract_text_images_tables(pdf_path):
-    doc = fitz.open(pdf_path)
-    full_text = ""
-    images = []
-    tables = []
-    math_formulas = []  # Pour les formules mathématiques (LaTeX)
-
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        full_text += page.get_text("text") + "\n"
-
-        # Extraction des images (schémas)
-        img_list = page.get_images(full=True)
-        for img_index, img in enumerate(img_list):
-            xref = img[0]
-            pix = fitz.Pixmap(doc, xref)
-            if pix.n < 5:  # C'est du GRAY ou RGB
-                img_path = f"temp_files/image_page{page_num+1}_{img_index+1}.png"
-                pix.save(img_path)
-                images.append(img_path)
-            pix = None
-
-        # Extraction des formules mathématiques (en recherchant le texte qui ressemble à LaTeX)
-        math_formulas += [line for line in page.get_text("text").split('\n') if '$' in line]
-
-    # Extraction des tableaux avec pdfplumber et sauvegarde en CSV
-    table_files = []  # Liste pour stocker les chemins des fichiers CSV
-
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf.pages):
-                # Utiliser pdfplumber pour extraire les tableaux
-                page_tables = page.extract_tables()
-                if page_tables:
-                    for table_index, table in enumerate(page_tables):
-                        # Sauvegarder chaque tableau en fichier CSV
-                        table_filename = f"temp_files/table_page{page_num+1}_{table_index+1}.csv"
-                        with open(table_filename, "w", newline="") as f:
-                            writer = csv.writer(f)
-                            writer.writerows(table)
-                        table_files.append(table_filename)
-    except Exception as e:
-        st.warning(f"Erreur avec pdfplumber pour l'extraction des tableaux: {e}")
-
-    return full_text, images, table_files, math_formulas
-
-# Fonction pour demander au modèle GPT de structurer le contenu
-def ask_gpt_for_structure(content):
-    prompt = f"""
-    Tu es un assistant pédagogique intelligent. Voici le contenu d'un cours en PDF :
-
-    {content}
-
-    Découpe ce document en : Introduction, Notion 1, Notion 2, ..., Conclusion.
-    Pour chaque section :
-    - Donne un titre
-    - Résume en 3 à 5 lignes avec les explications essentielles des notions et des formules en gardant les formules
-    - Identifie si des images, tableaux ou équations y sont liées
-    - Génére des QCM (QCU si applicable), un glossaire et des flashcards associés à chaque section
-    - Structure bien la réponse en JSON comme suit :
-    [
-      {{
-        "section": "Introduction",
-        "summary": "...",
-        "related_elements": ["image_page1_1.png", "eq_1.png"],
-        "qcm": [{{"question": "...", "choices": ["A", "B", "C"], "answer": "A"}}],
-        "glossary": [{{"term": "mot", "definition": "..."}}],
-        "flashcards": [{{"front": "...", "back": "..."}}]
-      }},
-      ...
-    ]
-    """
-
-    response = client.complete(
-        messages=[
-            SystemMessage("Tu es un expert en pédagogie et structure de contenu éducatif."),
-            UserMessage(prompt),
-        ],
-        temperature=0.3,
-        top_p=1.0,
-        model=model
-    )
-
-    return response.choices[0].message.content
+import csv  # Pour afficher les tableaux CSV
+from utils.content_store import get_content_store
+from utils.document_parser import resolve_element
+from utils.file_handlers import MAX_FILE_SIZE, save_upload
+from utils.jobs import get_job_queue, FAILED, QUEUED, RUNNING, UI_POLL_INTERVAL
+from utils.llm_cache import get_response_cache
+from utils.instrumentation import render_debug_panel
+from utils.retrieval import get_retrieval_store
+from utils.structuring import answer_question
+
+# Affichage d'une section structurée (résumé, éléments associés, QCM, glossaire, flashcards)
+def render_section(section, image_manifest, interactive=True, element_paths=None):
+    st.subheader(section["section"])
+    st.write(section["summary"])
+
+    # Affichage des éléments associés (images, tableaux, CSV, etc.)
+    if section.get("related_elements"):
+        for elem in section["related_elements"]:
+            # Fichiers conservés par la base de contenu, sinon dossier de travail
+            elem_path = (element_paths or {}).get(elem) or resolve_element(elem, image_manifest)
+            if os.path.exists(elem_path):
+                if elem.endswith(".png"):
+                    st.image(elem_path, caption=elem)
+                elif elem.endswith(".csv"):
+                    # Affichage du fichier CSV sous forme de dataframe
+                    try:
+                        with open(elem_path, "r") as f:
+                            csv_data = [row for row in csv.reader(f)]
+                            st.dataframe(csv_data)  # Affichage du contenu du CSV en tableau
+                    except Exception as e:
+                        st.error(f"Erreur lors de l'affichage du CSV : {e}")
+
+    # QCM (sans widgets pendant la génération en flux : les clés des
+    # boutons seraient recréées au rendu final)
+    if section.get("qcm"):
+        st.markdown("**QCM :**")
+        for i, q in enumerate(section["qcm"]):
+            if not interactive:
+                st.markdown(f"{i+1}. {q['question']}")
+                continue
+            answer = st.radio(f"{i+1}. {q['question']}", q['choices'], key=f"q_{section['section']}_{i}")
+            if st.button(f"Valider la réponse {i+1}", key=f"btn_{section['section']}_{i}"):
+                if answer.strip().lower() == q["answer"].strip().lower():
+                    st.success("✅ Correct")
+                else:
+                    st.error("❌ Incorrect")
+
+    # Affichage du glossaire
+    if section.get("glossary"):
+        st.markdown("**Glossaire :**")
+        for g in section["glossary"]:
+            st.markdown(f"- **{g['term']}** : {g['definition']}")
+
+    # Affichage des flashcards
+    if section.get("flashcards"):
+        st.markdown("**Flashcards :**")
+        for f in section["flashcards"]:
+            with st.expander(f["front"]):
+                st.write(f["back"])
 
 # Configuration de la page Streamlit
 st.set_page_config(page_title="Educational PDF App", layout="wide")
@@ -116,89 +69,95 @@ st.title("📘 Générateur de contenu éducatif à partir d'un PDF")
 with st.sidebar:
     st.header("📂 Source PDF")
     uploaded_file = st.file_uploader("Télécharger un fichier PDF", type="pdf")
+    # Recherche plein texte dans les résumés et glossaires des cours déjà traités
+    search_query = st.text_input("🔎 Rechercher dans les cours")
+    if search_query.strip():
+        results = get_content_store().search(search_query)
+        if not results:
+            st.caption("Aucun résultat.")
+        for row in results:
+            kind = "Glossaire" if row["kind"] == "glossary" else "Section"
+            st.markdown(f"**{row['title']}** ({kind}, {row['name'] or row['sha256'][:12]})  \n{row['snippet']}")
+    # Mesures de performance (durées par étape, pages OCR, tokens...) des derniers documents
+    if st.checkbox("Afficher les mesures", value=False):
+        render_debug_panel()
 
 
 if uploaded_file:
     if uploaded_file.size > MAX_FILE_SIZE:
-        st.error(f"Le fichier est trop volumineux. La taille maximale est de {MAX_FILE_SIZE / (1024 * 1024)} Mo.")
+        st.error(f"Le fichier est trop volumineux. La taille maximale est de {MAX_FILE_SIZE / (1024 * 1024):.0f} Mo.")
     else:
-        temp_dir = "./temp_files"
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-
-        pdf_path = os.path.join(temp_dir, uploaded_file.name)
-        with open(pdf_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # Copie du fichier dans le dossier de la session (par blocs)
+        pdf_path = save_upload(uploaded_file)
 
         st.success("✅ PDF chargé avec succès !")
 
+        # L'extraction et la génération tournent en arrière-plan : l'interface suit
+        # le travail à chaque rerun, sans bloquer les autres interactions
+        jobs = st.session_state.setdefault("jobs", {})
         if st.button("📤 Extraire le texte, les images, les tableaux, les formules et générer le contenu avec GPT-4"):
-            with st.spinner("Extraction en cours..."):
-                full_text, image_paths, table_files, math_formulas = extract_text_images_tables(pdf_path)
-                structured_content = ask_gpt_for_structure(full_text)
-
-            try:
-                try:
-                    structured_data = json.loads(structured_content)
-                except json.JSONDecodeError:
-                    # Si JSONDecodeError, essayez de parser avec ast.literal_eval
-                    try:
-                        structured_data = ast.literal_eval(structured_content)
-                    except Exception as e:
-                        st.error(f"Erreur lors du parsing du contenu structuré : {e}")
-                        structured_data = []
-                
+            # Mode incrémental : une nouvelle version du même cours ne renvoie au
+            # modèle que les passages modifiés
+            jobs[pdf_path] = get_job_queue().submit("structure", pdf_path, prompt="educational", incremental=True)
+            st.session_state.pop("structured_data", None)
+            st.session_state.pop("course_answer", None)
+
+        job = get_job_queue().get(jobs[pdf_path]) if pdf_path in jobs else None
+        if job and "structured_data" not in st.session_state:
+            if job["status"] in (QUEUED, RUNNING):
+                stage = "Génération du contenu" if job["stage"] == "structuration" else "Extraction"
+                with st.spinner(f"{stage} en cours..."):
+                    # Chaque section est affichée dès que le modèle l'a terminée
+                    for item in job["items"]:
+                        render_section(item["section"], None, interactive=False,
+                                       element_paths=item["element_paths"])
+                    time.sleep(UI_POLL_INTERVAL)
+                st.rerun()
+            elif job["status"] == FAILED:
+                st.error(f"Erreur lors de la génération du contenu structuré : {job['error']}")
+            else:
+                structured_data = job["result"]["sections"]
+                if not structured_data:
+                    st.error("Erreur lors du parsing du contenu structuré : aucune section exploitable.")
+
                 st.session_state["structured_data"] = structured_data
+                st.session_state["image_manifest"] = job["result"]["image_manifest"]
+                st.session_state["element_paths"] = job["result"].get("element_paths")
+                st.session_state["index_key"] = job["result"].get("index_key")
                 st.success("✅ Extraction terminée.")
-            except Exception as e:
-                st.error(f"Erreur lors du parsing du contenu structuré : {e}")
+
+                # Statistiques du cache des réponses du modèle
+                cache_stats = get_response_cache().stats()
+                st.caption(f"Cache GPT : {cache_stats['hit_rate']:.0%} de succès, {cache_stats['saved_tokens']} tokens économisés")
 
         if "structured_data" in st.session_state:
             structured_data = st.session_state["structured_data"]
 
             for section in structured_data:
-                st.subheader(section["section"])
-                st.write(section["summary"])
-
-                # Affichage des éléments associés (images, tableaux, CSV, etc.)
-                if section.get("related_elements"):
-                    for elem in section["related_elements"]:
-                        elem_path = os.path.join("temp_files", elem)
-                        if os.path.exists(elem_path):
-                            if elem.endswith(".png"):
-                                st.image(elem_path, caption=elem)
-                            elif elem.endswith(".csv"):
-                                # Affichage du fichier CSV sous forme de dataframe
-                                try:
-                                    with open(elem_path, "r") as f:
-                                        csv_data = [row for row in csv.reader(f)]
-                                        st.dataframe(csv_data)  # Affichage du contenu du CSV en tableau
-                                except Exception as e:
-                                    st.error(f"Erreur lors de l'affichage du CSV : {e}")
-
-                # QCM
-                if section.get("qcm"):
-                    st.markdown("**QCM :**")
-                    for i, q in enumerate(section["qcm"]):
-                        answer = st.radio(f"{i+1}. {q['question']}", q['choices'], key=f"q_{section['section']}_{i}")
-                        if st.button(f"Valider la réponse {i+1}", key=f"btn_{section['section']}_{i}"):
-                            if answer.strip().lower() == q["answer"].strip().lower():
-                                st.success("✅ Correct")
-                            else:
-                                st.error("❌ Incorrect")
-
-                # Affichage du glossaire
-                if section.get("glossary"):
-                    st.markdown("**Glossaire :**")
-                    for g in section["glossary"]:
-                        st.markdown(f"- **{g['term']}** : {g['definition']}")
-
-                # Affichage des flashcards
-                if section.get("flashcards"):
-                    st.markdown("**Flashcards :**")
-                    for f in section["flashcards"]:
-                        with st.expander(f["front"]):
-                            st.write(f["back"])
+                render_section(section, st.session_state.get("image_manifest"),
+                               element_paths=st.session_state.get("element_paths"))
+
+            # Questions libres : seuls les passages pertinents du cours sont envoyés
+            # au modèle. L'index a été construit par le travail de génération ;
+            # la question n'est traitée qu'à l'envoi du formulaire, pas à chaque rerun.
+            st.subheader("❓ Poser une question sur le cours")
+            with st.form("course_question"):
+                question = st.text_input("Votre question")
+                submitted = st.form_submit_button("Poser la question")
+            if submitted and question:
+                index_key = st.session_state.get("index_key")
+                index = get_retrieval_store().find_index(index_key) if index_key else None
+                if index is None:
+                    st.error("Index du cours indisponible : relancez la génération du contenu.")
+                else:
+                    with st.spinner("Recherche dans le cours..."):
+                        try:
+                            st.session_state["course_answer"] = answer_question(question, index)
+                        except Exception as e:
+                            st.session_state.pop("course_answer", None)
+                            st.error(f"Erreur lors de la réponse à la question : {e}")
+            if st.session_state.get("course_answer"):
+                st.write(st.session_state["course_answer"])
 
 else:
     st.info("Veuillez importer un fichier PDF à partir de la barre de gauche pour commencer.")
@@ -0,0 +1,135 @@
+import random
+
+import fitz  # PyMuPDF
+
+# Génération de PDF synthétiques pour les mesures de performance : le
+# contenu est pseudo-aléatoire mais déterministe (graine fixe), pour que deux
+# exécutions mesurent exactement les mêmes documents
+KINDS = ["text", "scanned", "multicolumn", "tables", "images"]
+
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size("a4")
+MARGIN = 56
+# Résolution des pages « scannées » (images pleine page sans couche texte)
+SCAN_DPI = 150
+
+VOCABULARY = (
+    "fonction dérivée intégrale limite suite série matrice vecteur espace probabilité variable aléatoire "
+    "théorème démonstration propriété exemple exercice solution équation inéquation courbe tangente "
+    "continuité convergence divergence polynôme racine coefficient graphe algorithme complexité donnée "
+    "modèle hypothèse résultat méthode calcul valeur ensemble élément relation application noyau image "
+    "base dimension rang déterminant trace produit somme différence quotient cours notion chapitre"
+).split()
+
+
+def _sentence(rng, words=12):
+    text = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng, sentences=5):
+    return " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(sentences))
+
+
+def _heading(page_num):
+    return f"{page_num // 4 + 1}.{page_num % 4 + 1} Notion {page_num + 1}"
+
+
+def _text_page(doc, rng, page_num):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_text((MARGIN, MARGIN), _heading(page_num), fontsize=14)
+    body = "\n\n".join(_paragraph(rng) for _ in range(5))
+    page.insert_textbox(fitz.Rect(MARGIN, MARGIN + 20, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN), body, fontsize=10)
+    return page
+
+
+def _multicolumn_page(doc, rng, page_num):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_text((MARGIN, MARGIN), _heading(page_num), fontsize=14)
+    gutter = 20
+    column_width = (PAGE_WIDTH - 2 * MARGIN - gutter) / 2
+    for column in range(2):
+        left = MARGIN + column * (column_width + gutter)
+        body = "\n\n".join(_paragraph(rng, 4) for _ in range(4))
+        page.insert_textbox(fitz.Rect(left, MARGIN + 20, left + column_width, PAGE_HEIGHT - MARGIN), body,
+                            fontsize=9)
+    return page
+
+
+def _tables_page(doc, rng, page_num):
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_text((MARGIN, MARGIN), _heading(page_num), fontsize=14)
+    rows, columns = 8, 4
+    cell_width = (PAGE_WIDTH - 2 * MARGIN) / columns
+    cell_height = 18
+    top = MARGIN + 20
+    # Deux tableaux réglés par page (traits horizontaux et verticaux)
+    for _ in range(2):
+        for row in range(rows + 1):
+            y = top + row * cell_height
+            page.draw_line((MARGIN, y), (PAGE_WIDTH - MARGIN, y))
+        for column in range(columns + 1):
+            x = MARGIN + column * cell_width
+            page.draw_line((x, top), (x, top + rows * cell_height))
+        for row in range(rows):
+            for column in range(columns):
+                value = rng.choice(VOCABULARY) if row == 0 else f"{rng.uniform(0, 1000):.2f}"
+                page.insert_text((MARGIN + column * cell_width + 4, top + row * cell_height + 13), value, fontsize=9)
+        top += rows * cell_height + 30
+    page.insert_textbox(fitz.Rect(MARGIN, top, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN), _paragraph(rng),
+                        fontsize=10)
+    return page
+
+
+def _pixmap(width, height, color, seed):
+    # Image unie avec un motif propre à la graine (contenu distinct par page)
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pix.set_rect(pix.irect, color)
+    rng = random.Random(seed)
+    for _ in range(6):
+        x, y = rng.randrange(width - 20), rng.randrange(height - 20)
+        pix.set_rect(fitz.IRect(x, y, x + 20, y + 20), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return pix
+
+
+def _images_page(doc, rng, page_num, logo):
+    page = _text_page(doc, rng, page_num)
+    # Logo répété sur chaque page (même image) et schémas propres à la page
+    page.insert_image(fitz.Rect(PAGE_WIDTH - MARGIN - 40, 10, PAGE_WIDTH - MARGIN, 40), pixmap=logo)
+    for index in range(3):
+        top = MARGIN + 200 + index * 180
+        rect = fitz.Rect(MARGIN + 300, top, PAGE_WIDTH - MARGIN, top + 160)
+        pix = _pixmap(320, 240, (200, 220, 240), seed=page_num * 10 + index)
+        page.insert_image(rect, pixmap=pix)
+    return page
+
+
+def _scanned_page(doc, rng, page_num, scratch):
+    # Page de texte rendue en image puis insérée seule : aucune couche texte
+    source = _text_page(scratch, rng, page_num)
+    pix = source.get_pixmap(dpi=SCAN_DPI, alpha=False)
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_image(page.rect, pixmap=pix)
+    return page
+
+
+def generate(kind, pages, path, seed=0):
+    # Écrit un PDF de `pages` pages du type demandé et renvoie son chemin
+    if kind not in KINDS:
+        raise ValueError(f"Type de document inconnu : {kind}")
+    rng = random.Random(f"{kind}-{pages}-{seed}")
+    logo = _pixmap(64, 64, (30, 60, 120), seed=-1)
+
+    with fitz.open() as doc, fitz.open() as scratch:
+        for page_num in range(pages):
+            if kind == "text":
+                _text_page(doc, rng, page_num)
+            elif kind == "scanned":
+                _scanned_page(doc, rng, page_num, scratch)
+            elif kind == "multicolumn":
+                _multicolumn_page(doc, rng, page_num)
+            elif kind == "tables":
+                _tables_page(doc, rng, page_num)
+            else:
+                _images_page(doc, rng, page_num, logo)
+        doc.save(path, garbage=3, deflate=True)
+    return path
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+# Faux ChatCompletionsClient pour les mesures hors ligne : même interface
+# asynchrone que azure.ai.inference.aio.ChatCompletionsClient (complete, avec
+# ou sans flux), une latence simulée et une réponse JSON bien formée
+LLM_LATENCY = float(os.getenv("BENCH_LLM_LATENCY", 0.5))  # Latence avant le premier token (secondes)
+LLM_TOKENS_PER_SECOND = float(os.getenv("BENCH_LLM_TOKENS_PER_SECOND", 200))
+STREAM_PIECE_TOKENS = 8  # Taille approximative de chaque morceau du flux
+
+
+def _estimate_tokens(text):
+    # Approximation (≈ 4 caractères par token) : pas d'encodage tiktoken ici
+    return max(1, len(text) // 4)
+
+
+def _fake_sections(prompt):
+    # Une section par titre « Notion » du contenu reçu, encadrée d'une
+    # introduction et d'une conclusion
+    notions = sum(1 for line in prompt.split("\n") if " Notion " in line) or 1
+    sections = [{"section": "Introduction", "summary": "Présentation du cours.", "related_elements": []}]
+    for index in range(notions):
+        sections.append({
+            "section": f"Notion {index + 1}",
+            "summary": "Résumé de la notion, avec les définitions et formules essentielles.",
+            "related_elements": [],
+        })
+    sections.append({"section": "Conclusion", "summary": "Synthèse du cours.", "related_elements": []})
+    return json.dumps(sections, ensure_ascii=False, indent=2)
+
+
+class _FakeStream:
+    def __init__(self, pieces, usage, tokens_per_second):
+        self._pieces = pieces
+        self._usage = usage
+        self._tokens_per_second = tokens_per_second
+
+    async def __aiter__(self):
+        for piece in self._pieces:
+            await asyncio.sleep(STREAM_PIECE_TOKENS / self._tokens_per_second)
+            delta = SimpleNamespace(content=piece)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=self._usage)
+
+    async def close(self):
+        pass
+
+
+class FakeChatCompletionsClient:
+    def __init__(self, endpoint=None, credential=None, latency=None, tokens_per_second=None, **kwargs):
+        self.latency = LLM_LATENCY if latency is None else latency
+        self.tokens_per_second = LLM_TOKENS_PER_SECOND if tokens_per_second is None else tokens_per_second
+        self.requests = 0
+
+    async def complete(self, messages, stream=False, **params):
+        self.requests += 1
+        prompt = "\n".join(message.content for message in messages)
+        content = _fake_sections(prompt)
+        usage = SimpleNamespace(prompt_tokens=_estimate_tokens(prompt), completion_tokens=_estimate_tokens(content))
+        await asyncio.sleep(self.latency)
+
+        if stream:
+            size = STREAM_PIECE_TOKENS * 4
+            pieces = [content[i:i + size] for i in range(0, len(content), size)]
+            return _FakeStream(pieces, usage, self.tokens_per_second)
+
+        await asyncio.sleep(usage.completion_tokens / self.tokens_per_second)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    async def close(self):
+        pass
+
+
+def install():
+    # Remplace le client du module utils.llm_client (avant toute requête)
+    from utils import llm_client
+
+    llm_client.ChatCompletionsClient = FakeChatCompletionsClient
+    llm_client.token = llm_client.token or "offline"
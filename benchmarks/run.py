@@ -0,0 +1,189 @@
+# benchmarks/run.py
+# python -m benchmarks.run                       (tous les types, 10 / 100 / 500 pages)
+# python -m benchmarks.run --kinds text tables --sizes 10 50
+# python -m benchmarks.run --save-baseline       (enregistre les résultats comme référence)
+#
+# Mesures hors ligne : les PDF sont générés localement et le modèle est
+# remplacé par un faux client à latence simulée. Les modèles PaddleOCR et
+# l'encodage tiktoken doivent déjà être présents dans leurs caches locaux
+# (sinon : --skip-ocr, et les documents scannés sont mesurés sans OCR).
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_SIZES = [10, 100, 500]
+# Écart toléré par rapport à la référence avant de signaler une régression
+TOLERANCE = 0.15
+
+
+def _peak_rss():
+    # Pic de mémoire résidente (octets) du processus et de ses processus
+    # d'extraction ; ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * unit
+
+
+def _measure(func, page_count):
+    from utils.instrumentation import recent_reports
+
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    report = recent_reports()[-1] if recent_reports() else {}
+    return result, {
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(page_count / seconds, 2) if seconds else None,
+        "timings": report.get("timings", {}),
+        "counters": report.get("counters", {}),
+    }
+
+
+def run_case(pdf_path, pages, workers, skip_ocr):
+    # Exécuté dans un processus dédié : le pic de mémoire mesuré est celui du cas
+    from benchmarks import fake_llm
+
+    pdf_path = os.path.abspath(pdf_path)
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    cwd = os.getcwd()
+    try:
+        # Les fonctions d'extraction écrivent dans ./temp_files
+        os.chdir(workdir)
+        os.makedirs("temp_files")
+
+        fake_llm.install()
+        from utils.document_parser import extract_text_images_tables
+        from utils.pdf_preprocessing import extract_text_from_pdf
+        from utils.structuring import ask_gpt_for_structure
+
+        results = {"pages": pages}
+        page_texts, results["extract_text_from_pdf"] = _measure(
+            lambda: extract_text_from_pdf(pdf_path, ocr_if_needed=not skip_ocr, use_cache=False, workers=workers),
+            pages,
+        )
+        _, results["extract_text_images_tables"] = _measure(
+            lambda: extract_text_images_tables(pdf_path, use_cache=False), pages
+        )
+        _, results["ask_gpt_for_structure"] = _measure(
+            lambda: ask_gpt_for_structure("\n".join(page_texts), use_cache=False), pages
+        )
+        results["peak_rss"] = _peak_rss()
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_in_subprocess(pdf_path, pages, workers, skip_ocr):
+    command = [sys.executable, "-m", "benchmarks.run", "--case", pdf_path, str(pages), "--workers", str(workers)]
+    if skip_ocr:
+        command.append("--skip-ocr")
+    # Pas de fichier de mesures ni de cache pendant les mesures
+    env = dict(os.environ, METRICS_LOG_PATH="")
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "échec"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+# Indicateurs comparés à la référence : (nom, extraction, sens souhaité)
+COMPARED = [
+    ("pages/s texte", lambda r: r["extract_text_from_pdf"]["pages_per_second"], "higher"),
+    ("pages/s tableaux", lambda r: r["extract_text_images_tables"]["pages_per_second"], "higher"),
+    ("structuration (s)", lambda r: r["ask_gpt_for_structure"]["seconds"], "lower"),
+    ("pic RSS (Mo)", lambda r: round(r["peak_rss"] / (1024 * 1024), 1), "lower"),
+]
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    # Renvoie les lignes du rapport et le nombre de régressions
+    lines = []
+    regressions = 0
+    for case, result in results.items():
+        if "error" in result:
+            lines.append(f"{case:<20} ERREUR : {result['error']}")
+            continue
+        reference = baseline.get(case)
+        for label, metric, direction in COMPARED:
+            value = metric(result)
+            line = f"{case:<20} {label:<20} {value:>10}"
+            if reference and "error" not in reference:
+                previous = metric(reference)
+                if previous:
+                    change = (value - previous) / previous
+                    worse = change < -tolerance if direction == "higher" else change > tolerance
+                    regressions += worse
+                    line += f"   référence {previous:>10}  {change:+.0%}" + ("  RÉGRESSION" if worse else "")
+            lines.append(line)
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mesures de performance hors ligne de l'extraction et de la structuration")
+    parser.add_argument("--kinds", nargs="+", default=None, help="Types de documents (text, scanned, ...)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Nombres de pages")
+    parser.add_argument("--workers", type=int, default=1, help="Processus d'extraction")
+    parser.add_argument("--skip-ocr", action="store_true", help="Ne pas passer les pages scannées à l'OCR")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichier de référence")
+    parser.add_argument("--save-baseline", action="store_true", help="Enregistrer les résultats comme référence")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Écart toléré (0.15 = 15 %%)")
+    parser.add_argument("--output", help="Fichier JSON où écrire les résultats détaillés")
+    parser.add_argument("--case", nargs=2, metavar=("PDF", "PAGES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case[0], int(args.case[1]), args.workers, args.skip_ocr)))
+        return 0
+
+    from benchmarks.corpus import KINDS, generate
+
+    results = {}
+    corpus_dir = tempfile.mkdtemp(prefix="bench-corpus-")
+    try:
+        for kind in args.kinds or KINDS:
+            for pages in args.sizes:
+                case = f"{kind}/{pages}"
+                print(f"… {case}", file=sys.stderr)
+                start = time.perf_counter()
+                pdf_path = generate(kind, pages, os.path.join(corpus_dir, f"{kind}_{pages}.pdf"))
+                generation_seconds = time.perf_counter() - start
+                results[case] = _run_in_subprocess(pdf_path, pages, args.workers, args.skip_ocr)
+                results[case]["generation_seconds"] = round(generation_seconds, 4)
+                os.remove(pdf_path)
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    lines, regressions = compare(results, baseline, args.tolerance)
+    print("\n".join(lines))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            measured = {case: result for case, result in results.items() if "error" not in result}
+            json.dump({**baseline, **measured}, f, indent=2, ensure_ascii=False)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
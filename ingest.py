@@ -0,0 +1,204 @@
+# ingest.py
+# python ingest.py cours/ --output resultats/
+# python ingest.py manifeste.txt --output resultats/ --jobs 8 --llm-concurrency 8
+#
+# Traitement par lots, sans interface : extraction puis structuration de
+# chaque PDF d'un dossier (récursivement) ou d'un manifeste (un chemin par
+# ligne). Chaque document produit <sortie>/<empreinte>.json, écrit de façon
+# atomique : une exécution interrompue reprend là où elle s'était arrêtée,
+# en sautant les documents déjà traités.
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description="Extraction et structuration de cours PDF par lots")
+    parser.add_argument("source", help="Dossier de PDF, ou manifeste (un chemin de PDF par ligne)")
+    parser.add_argument("--output", required=True, help="Dossier des résultats")
+    parser.add_argument("--prompt", choices=["structure", "educational"], default="educational",
+                        help="Gabarit de structuration")
+    parser.add_argument("--no-tables", action="store_true", help="Ne pas extraire les tableaux")
+    parser.add_argument("--extract-only", action="store_true",
+                        help="Extraction du texte page par page seulement, sans appel au modèle")
+    parser.add_argument("--jobs", type=int, default=4, help="Documents traités simultanément")
+    parser.add_argument("--extraction-workers", type=int, default=1,
+                        help="Processus d'extraction par document (--extract-only)")
+    parser.add_argument("--extraction-processes", type=int, default=None,
+                        help="Documents extraits simultanément, chacun dans son processus "
+                             "(par défaut : --jobs, dans la limite du nombre de cœurs)")
+    parser.add_argument("--llm-concurrency", type=int, default=None,
+                        help="Requêtes simultanées vers le modèle, tous documents confondus")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Découpage stable : réutilise les réponses des versions précédentes d'un cours")
+    parser.add_argument("--force", action="store_true", help="Retraiter les documents déjà traités")
+    return parser.parse_args()
+
+
+def list_pdfs(source):
+    # Dossier : tous les PDF qu'il contient (récursivement), triés
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths += [os.path.join(root, name) for name in files if name.lower().endswith(".pdf")]
+        return sorted(paths)
+
+    # Manifeste : chemins relatifs au dossier du manifeste, lignes « # » ignorées
+    base_dir = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                paths.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+    return paths
+
+
+def _write_json(path, data):
+    # Fichier temporaire puis renommage : un résultat présent est toujours complet
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def extract_document(pdf_path, digest, args):
+    # Exécuté dans un processus d'extraction (rendu, OCR, tableaux : calcul
+    # pur, qui bloquerait les autres documents sous le GIL). Renvoie le
+    # résultat partiel, le texte des pages et les mesures de l'extraction.
+    from utils.document_parser import extract_text_images, extract_text_images_tables
+    from utils.instrumentation import Metrics, use_metrics
+    from utils.pdf_preprocessing import extract_text_from_pdf
+
+    result = {"source": os.path.abspath(pdf_path), "sha256": digest}
+    page_texts = None
+    with use_metrics(Metrics("ingest", os.path.basename(pdf_path))) as metrics:
+        if args.extract_only:
+            result["pages"] = extract_text_from_pdf(pdf_path, workers=args.extraction_workers)
+        else:
+            # Images et tableaux dans un dossier propre au document (pas de
+            # collision de noms entre documents traités en parallèle)
+            files_dir = os.path.join(args.output, digest)
+            os.makedirs(files_dir, exist_ok=True)
+            if args.no_tables:
+                page_texts, images, image_manifest = extract_text_images(pdf_path, output_dir=files_dir)
+                result.update(images=images, image_manifest=image_manifest)
+            else:
+                page_texts, images, tables, math_formulas, image_manifest = extract_text_images_tables(
+                    pdf_path, output_dir=files_dir)
+                result.update(images=images, tables=tables, math_formulas=math_formulas,
+                              image_manifest=image_manifest)
+    return result, page_texts, metrics.as_dict()
+
+
+def structure_document(pdf_path, digest, args, extracted):
+    # Exécuté dans un thread : la structuration attend surtout les réponses
+    # du modèle. `extracted` : valeur renvoyée par extract_document.
+    from utils.content_store import content_variant, get_content_store, is_complete
+    from utils.document_parser import element_paths
+    from utils.instrumentation import track_document
+    from utils.structuring import STRUCTURE_PROMPT, stream_educational_content, stream_structure
+
+    result, page_texts, extraction_metrics = extracted
+    with track_document("ingest", os.path.basename(pdf_path)) as metrics:
+        metrics.merge(extraction_metrics)
+        if not args.extract_only:
+            if args.prompt == "educational":
+                sections = stream_educational_content(page_texts, incremental=args.incremental)
+            else:
+                sections = stream_structure(page_texts, STRUCTURE_PROMPT, incremental=args.incremental)
+            result["sections"] = list(sections)
+
+            # Enregistré aussi dans la base de contenu, servie ensuite par
+            # l'application (sauf résultat vide ou incomplet)
+            if is_complete(result["sections"]):
+                files_dir = os.path.join(args.output, digest)
+                get_content_store().save_document(digest, content_variant(args.prompt, not args.no_tables),
+                                                  result["sections"], result["image_manifest"],
+                                                  name=os.path.basename(pdf_path),
+                                                  element_paths=element_paths(result["sections"],
+                                                                              result["image_manifest"], files_dir))
+    result["metrics"] = metrics.as_dict()
+    return result
+
+
+def main():
+    args = _parse_args()
+    # Limite globale de concurrence lue à l'import du client
+    if args.llm_concurrency:
+        os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+
+    from utils.extraction_cache import pdf_hash
+
+    os.makedirs(args.output, exist_ok=True)
+    pdf_paths = list_pdfs(args.source)
+    total = len(pdf_paths)
+    print(f"{total} document(s) à traiter")
+
+    done = skipped = failed = 0
+    # Extraction dans des processus (lancés par « spawn », comme le pool
+    # d'extraction des pages), structuration dans des threads
+    extraction_processes = max(1, args.extraction_processes or min(args.jobs, os.cpu_count() or 1))
+    extraction_pool = ProcessPoolExecutor(max_workers=extraction_processes,
+                                          mp_context=multiprocessing.get_context("spawn"))
+
+    def run(pdf_path):
+        try:
+            digest = pdf_hash(pdf_path)
+        except OSError as e:
+            print(f"Fichier illisible : {pdf_path} ({e})")
+            return "failed", pdf_path, 0.0
+        result_path = os.path.join(args.output, f"{digest}.json")
+        error_path = os.path.join(args.output, f"{digest}.error.json")
+        if os.path.exists(result_path) and not args.force:
+            return "skipped", pdf_path, 0.0
+
+        start = time.perf_counter()
+        try:
+            extracted = extraction_pool.submit(extract_document, pdf_path, digest, args).result()
+            result = structure_document(pdf_path, digest, args, extracted)
+        except Exception as e:
+            # L'erreur est consignée ; le document sera retenté à la prochaine exécution
+            _write_json(error_path, {"source": os.path.abspath(pdf_path), "error": str(e),
+                                     "traceback": traceback.format_exc()})
+            return "failed", pdf_path, time.perf_counter() - start
+        _write_json(result_path, result)
+        if os.path.exists(error_path):
+            os.remove(error_path)
+        return "done", pdf_path, time.perf_counter() - start
+
+    executor = ThreadPoolExecutor(max_workers=max(1, args.jobs))
+    try:
+        futures = [executor.submit(run, pdf_path) for pdf_path in pdf_paths]
+        for future in as_completed(futures):
+            status, pdf_path, seconds = future.result()
+            if status == "done":
+                done += 1
+            elif status == "skipped":
+                skipped += 1
+            else:
+                failed += 1
+            finished = done + skipped + failed
+            if status != "skipped":
+                print(f"[{finished}/{total}] {status:<6} {pdf_path} ({seconds:.1f} s)")
+    except KeyboardInterrupt:
+        print("Interruption : les documents terminés sont conservés, relancer la commande pour reprendre.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        extraction_pool.shutdown(wait=False, cancel_futures=True)
+        return 130
+    executor.shutdown()
+    extraction_pool.shutdown()
+
+    print(f"Terminé : {done} traité(s), {skipped} déjà présent(s), {failed} en échec")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
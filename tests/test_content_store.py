@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+from utils.content_store import ContentStore, is_complete
+
+
+def test_round_trip_copies_cited_files(tmp_path):
+    source = tmp_path / "extraction" / "image_page1_1.png"
+    source.parent.mkdir()
+    source.write_bytes(b"png")
+    store = ContentStore(db_path=str(tmp_path / "content.sqlite3"), files_dir=str(tmp_path / "files"))
+    sections = [{
+        "section": "Dérivées",
+        "summary": "Définition et règles de calcul.",
+        "related_elements": ["image_page1_1.png"],
+        "glossary": [{"term": "dérivée", "definition": "limite du taux d'accroissement"}],
+    }]
+
+    store.save_document("abc", "structure", sections,
+                        element_paths={"image_page1_1.png": str(source)}, name="cours.pdf")
+    document = store.get_document("abc", "structure")
+
+    assert document["sections"] == sections
+    stored = document["element_paths"]["image_page1_1.png"]
+    assert stored != str(source)
+    assert os.path.dirname(stored) == os.path.join(str(tmp_path / "files"), "abc")
+    with open(stored, "rb") as f:
+        assert f.read() == b"png"
+    assert store.get_document("abc", "educational") is None
+
+
+def test_empty_or_incomplete_results_are_not_kept():
+    section = {"section": "Dérivées", "summary": "Règles de calcul.", "qcm": [], "glossary": [], "flashcards": []}
+
+    assert not is_complete([])
+    assert not is_complete([section, {**section, "incomplete": True}])
+    assert is_complete([section])
+
+
+def _store_with_course(tmp_path):
+    store = ContentStore(db_path=str(tmp_path / "content.sqlite3"), files_dir=str(tmp_path / "files"))
+    store.save_document("abc", "structure", [
+        {"section": "Dérivées", "summary": "Définition et règles de calcul.",
+         "glossary": [{"term": "tangente", "definition": "droite qui touche la courbe en un point"}]},
+        {"section": "Intégrales", "summary": "Aire sous la courbe."},
+    ], name="cours.pdf")
+    return store
+
+
+def test_search_full_text_matches_prefixes_without_accents(tmp_path):
+    store = _store_with_course(tmp_path)
+    if not store.fts:
+        pytest.skip("SQLite compilé sans FTS5")
+
+    results = store.search("regles calc")
+    assert [(row["kind"], row["title"], row["name"]) for row in results] == [("section", "Dérivées", "cours.pdf")]
+    assert "[règles]" in results[0]["snippet"]
+    assert {row["kind"] for row in store.search("courbe")} == {"section", "glossary"}
+    # Syntaxe FTS5 saisie par l'utilisateur : cherchée comme du texte
+    assert store.search('courbe" OR "aire') == []
+    assert store.search("   ") == []
+
+
+def test_search_falls_back_to_like_without_fts(tmp_path):
+    store = _store_with_course(tmp_path)
+    store.fts = False
+
+    assert [(row["kind"], row["title"]) for row in store.search("courbe")] == [
+        ("section", "Intégrales"), ("glossary", "tangente")]
+    assert store.search("courbe", limit=1)[0]["title"] == "Intégrales"
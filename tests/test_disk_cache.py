@@ -0,0 +1,40 @@
+import os
+import time
+
+from utils.disk_cache import evict, staged
+from utils.extraction_cache import ExtractionCache
+from utils.llm_cache import ResponseCache
+
+
+def test_staged_entry_is_published_whole(tmp_path):
+    target = tmp_path / "entry"
+    with staged(str(tmp_path), str(target)) as tmp_dir:
+        os.makedirs(tmp_dir)
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            f.write("{}")
+        assert not target.exists()
+
+    assert (target / "manifest.json").exists()
+    assert [name for name in os.listdir(tmp_path) if name.startswith(".tmp-")] == []
+
+
+def test_evict_removes_least_recently_used_entries(tmp_path):
+    now = time.time()
+    for age, name in enumerate(["recent", "old", "older"]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (now - age * 60, now - age * 60))
+
+    evict(str(tmp_path), max_size=20)
+
+    assert sorted(os.listdir(tmp_path)) == ["old", "recent"]
+
+
+def test_caches_round_trip_and_evict(tmp_path):
+    extraction = ExtractionCache(cache_dir=str(tmp_path / "extraction"), max_size=10 ** 6)
+    extraction.put("a", {"text": "page"})
+    assert extraction.get("a") == {"text": "page"}
+
+    responses = ResponseCache(cache_dir=str(tmp_path / "llm"), max_size=0)
+    responses.put("a", "réponse")
+    assert responses.get("a") is None
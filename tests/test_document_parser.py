@@ -0,0 +1,49 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("cv2")
+pytest.importorskip("pdfplumber")
+
+from utils import document_parser, extraction_cache
+from utils.extraction_cache import ExtractionCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(extraction_cache, "_default_cache", cache)
+    return cache
+
+
+def _write_table_pdf(path):
+    # Page quadrillée : repérée comme susceptible de contenir un tableau
+    doc = fitz.open()
+    page = doc.new_page()
+    for i in range(3):
+        page.draw_line((72, 72 + 40 * i), (372, 72 + 40 * i))
+        page.draw_line((72 + 150 * i, 72), (72 + 150 * i, 152))
+    page.insert_text((80, 100), "Dérivée")
+    doc.save(str(path))
+    doc.close()
+
+
+def test_failed_table_extraction_is_logged_and_not_cached(tmp_path, cache, monkeypatch, caplog):
+    pdf_path = tmp_path / "cours.pdf"
+    _write_table_pdf(pdf_path)
+
+    calls = []
+
+    def broken_open(path):
+        calls.append(path)
+        raise RuntimeError("pdfplumber indisponible")
+
+    monkeypatch.setattr(document_parser.pdfplumber, "open", broken_open)
+    with caplog.at_level("WARNING", logger="e_learning.extraction"):
+        page_texts, _, tables, _, _ = document_parser.extract_text_images_tables(
+            str(pdf_path), output_dir=str(tmp_path))
+
+    assert "Dérivée" in page_texts[0] and tables == []
+    assert "pdfplumber indisponible" in caplog.text
+    # Pas de résultat partiel en cache : la seconde extraction retente les tableaux
+    document_parser.extract_text_images_tables(str(pdf_path), output_dir=str(tmp_path))
+    assert len(calls) == 2 and cache.stats()["hits"] == 0
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+pytest.importorskip("tiktoken")
+pytest.importorskip("azure.ai.inference")
+
+from utils import structuring
+
+
+class _Index:
+    # Index de recherche minimal : passages cités dans le prompt de chaque section
+    def context(self, query, k, label_pages=True):
+        return f"[passages pour {query.splitlines()[0]}]"
+
+
+def test_educational_content_fans_out_one_request_per_section(monkeypatch):
+    outline = [{"section": title, "summary": f"Résumé {title}.", "related_elements": []} for title in "ABC"]
+    activities = {"qcm": [{"question": "q ?", "choices": ["x", "y"], "answer": "x"}],
+                  "glossary": [{"term": "t", "definition": "d"}], "flashcards": [{"front": "f", "back": "b"}]}
+    prompts = []
+
+    def complete_each(conversations, **params):
+        # Réponses dans le désordre ; la section B échoue à chaque tentative
+        for index in reversed(range(len(conversations))):
+            prompt = conversations[index][-1].content
+            prompts.append(prompt)
+            if "Titre : B" in prompt:
+                yield index, None, RuntimeError("délai dépassé")
+            else:
+                yield index, json.dumps(activities), None
+
+    monkeypatch.setattr(structuring, "stream", lambda messages, **params: iter([json.dumps(outline)[:20],
+                                                                                 json.dumps(outline)[20:]]))
+    monkeypatch.setattr(structuring, "complete_each", complete_each)
+    monkeypatch.setattr(structuring, "count_tokens", lambda text: len(text.split()))
+
+    sections = list(structuring.stream_educational_content("Cours.", use_cache=False, index=_Index()))
+
+    assert [section["section"] for section in sections] == ["A", "B", "C"]
+    assert sections[0]["qcm"] == activities["qcm"] and not sections[0].get("incomplete")
+    assert sections[1]["incomplete"] and sections[1]["qcm"] == []
+    assert sections[2]["flashcards"] == activities["flashcards"]
+    # Une requête par section, avec ses passages du cours, puis les nouvelles tentatives de B
+    assert len(prompts) == 3 + structuring.SECTION_MAX_ATTEMPTS - 1
+    assert all(f"[passages pour {title}]" in prompt for title, prompt in zip("CBA", prompts))
@@ -0,0 +1,43 @@
+from utils import instrumentation
+from utils.instrumentation import count, current_metrics, recent_reports, track_document, track_iter
+
+
+def _pages(n):
+    for page in range(n):
+        count("pages")
+        yield page
+
+
+def test_metrics_do_not_leak_into_caller_between_items(monkeypatch):
+    monkeypatch.setattr(instrumentation, "METRICS_LOG_PATH", "")
+    pages = track_iter("pages", "cours.pdf", _pages(3))
+
+    assert next(pages) == 0
+    assert current_metrics() is None
+    pages.close()
+
+    assert current_metrics() is None
+    assert recent_reports()[-1]["counters"] == {"pages": 1}
+
+
+def test_consumer_failure_leaves_no_stale_metrics(monkeypatch):
+    monkeypatch.setattr(instrumentation, "METRICS_LOG_PATH", "")
+    try:
+        for _ in track_iter("pages", "cours.pdf", _pages(3)):
+            raise RuntimeError("emit")
+    except RuntimeError:
+        pass
+
+    assert current_metrics() is None
+    with track_document("structure_job", "autre.pdf") as metrics:
+        count("sections")
+    assert metrics.name == "autre.pdf"
+    assert recent_reports()[-1]["document"] == "autre.pdf"
+
+
+def test_nested_generator_reports_into_open_document(monkeypatch):
+    monkeypatch.setattr(instrumentation, "METRICS_LOG_PATH", "")
+    with track_document("structure_job", "cours.pdf") as metrics:
+        assert list(track_iter("pages", "cours.pdf", _pages(2))) == [0, 1]
+
+    assert metrics.counters == {"pages": 2}
@@ -0,0 +1,49 @@
+import time
+
+from utils.jobs import DONE, QUEUED, RUNNING, JobQueue, job_handler
+
+
+@job_handler("test_sleep")
+def _sleep_job(job, pdf_path, seconds=0.0):
+    time.sleep(seconds)
+    return {"slept": seconds}
+
+
+def _insert(queue, job_id, status, updated_at):
+    with queue._connect() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, kind, pdf_path, options, status, created_at, updated_at) "
+            "VALUES (?, 'test_sleep', 'cours.pdf', '{}', ?, ?, ?)",
+            (job_id, status, updated_at, updated_at),
+        )
+
+
+def test_only_running_jobs_with_an_expired_lease_are_requeued(tmp_path):
+    queue = JobQueue(db_path=str(tmp_path / "jobs.sqlite3"), workers=0, lease=60)
+    now = time.time()
+    _insert(queue, "live", RUNNING, now - 10)
+    _insert(queue, "stale", RUNNING, now - 120)
+
+    # Une seconde file sur la même base (autre processus) ne reprend pas le travail vivant
+    JobQueue(db_path=queue.db_path, workers=0, lease=60)
+    assert queue.get("live")["status"] == RUNNING
+
+    assert queue._claim()["id"] == "stale"
+    assert queue._claim() is None
+
+
+def test_heartbeat_keeps_a_long_job_leased(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    queue = JobQueue(db_path=db_path, workers=1, lease=0.4)
+    job_id = queue.submit("test_sleep", "cours.pdf", seconds=1.2)
+
+    time.sleep(0.8)
+    other = JobQueue(db_path=db_path, workers=0, lease=0.4)
+    assert other.get(job_id)["status"] == RUNNING
+    assert other._claim() is None
+
+    deadline = time.time() + 5
+    while queue.get(job_id)["status"] in (QUEUED, RUNNING) and time.time() < deadline:
+        time.sleep(0.05)
+    assert queue.get(job_id)["status"] == DONE
+    assert queue.get(job_id)["result"] == {"slept": 1.2}
@@ -0,0 +1,50 @@
+import json
+
+from utils.json_stream import JSONArrayStreamParser
+
+
+def _feed_all(pieces):
+    parser = JSONArrayStreamParser()
+    elements = []
+    for piece in pieces:
+        elements += parser.feed_raw(piece)
+    return parser, elements
+
+
+def test_objects_split_across_feed_boundaries():
+    text = '[{"section": "A", "summary": "s"}, {"section": "B", "related_elements": [1, 2]}]'
+
+    for size in (1, 3, 7):
+        parser, elements = _feed_all([text[i:i + size] for i in range(0, len(text), size)])
+        assert [json.loads(raw)["section"] for raw in elements] == ["A", "B"]
+        assert parser.pending == ""
+
+
+def test_braces_and_brackets_inside_strings():
+    objects = [{"section": "Ensembles {a, b}", "summary": "Intervalle [0, 1[ et \"}\" échappé \\"},
+               {"section": "B", "summary": "]"}]
+    text = json.dumps(objects, ensure_ascii=False)
+
+    parser, elements = _feed_all([text[:25], text[25:]])
+    assert [json.loads(raw) for raw in elements] == objects
+
+
+def test_code_fences_and_bracketed_preamble_are_skipped():
+    text = 'Plan [Intro, Conclusion] :\n```json\n[ {"section": "A"} ]\n```\n[{"section": "ignoré"}]'
+
+    parser, elements = _feed_all([text])
+    assert elements == ['{"section": "A"}']
+    assert parser.started
+
+
+def test_truncated_final_object_is_pending():
+    parser, elements = _feed_all(['[{"section": "A"}, {"section": "B", "summ', 'ary": "coupé'])
+
+    assert elements == ['{"section": "A"}']
+    assert parser.pending == '{"section": "B", "summary": "coupé'
+
+
+def test_text_without_array_is_not_started():
+    parser, elements = _feed_all(["Je ne peux pas [répondre]."])
+
+    assert elements == [] and not parser.started and parser.pending == ""
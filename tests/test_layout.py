@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from utils.layout import reading_order
+
+# Page A4 (595 x 842 pt), marges de 50 pt, deux colonnes de 240 pt
+LEFT = (50, 300)
+RIGHT = (345, 545)
+
+
+def _block(column, top, height=80):
+    return (column[0], top, column[1], top + height)
+
+
+def test_two_columns_are_read_one_after_the_other():
+    # Blocs dans l'ordre du flux PDF : alternance gauche / droite
+    rects = [_block(LEFT, 100), _block(RIGHT, 100), _block(LEFT, 200), _block(RIGHT, 200), _block(LEFT, 300)]
+
+    assert list(reading_order(rects)) == [0, 2, 4, 1, 3]
+
+
+def test_full_width_header_comes_before_the_columns():
+    rects = [
+        _block(RIGHT, 150),  # 0
+        _block(LEFT, 250),  # 1
+        (50, 60, 545, 110),  # 2 : titre sur toute la largeur
+        _block(LEFT, 150),  # 3
+        _block(RIGHT, 250),  # 4
+        (50, 700, 545, 740),  # 5 : note de bas de page sur toute la largeur
+        _block(LEFT, 760),  # 6 : après la note, nouvelle bande
+    ]
+
+    assert list(reading_order(rects)) == [2, 3, 1, 0, 4, 5, 6]
+
+
+def test_single_block_and_empty_page():
+    assert list(reading_order([(50, 60, 545, 110)])) == [0]
+    assert list(reading_order([])) == []
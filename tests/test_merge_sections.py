@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+pytest.importorskip("azure.ai.inference")
+
+from utils.structuring import merge_sections
+
+
+def test_same_number_from_different_chunks_is_not_merged():
+    merged = merge_sections([
+        [{"section": "Introduction", "summary": "Intro"}, {"section": "Notion 1 : Dérivées", "summary": "Dérivées"}],
+        [{"section": "Notion 1 : Intégrales", "summary": "Intégrales"}, {"section": "Conclusion", "summary": "Fin"}],
+    ])
+
+    assert [section["section"] for section in merged] == [
+        "Introduction", "Notion 1 : Dérivées", "Notion 2 : Intégrales", "Conclusion"]
+    assert merged[2]["summary"] == "Intégrales"
+
+
+def test_bare_notion_titles_are_not_merged():
+    merged = merge_sections([[{"section": "Notion 1", "summary": "a"}], [{"section": "Notion 1", "summary": "b"}]])
+
+    assert [section["section"] for section in merged] == ["Notion 1", "Notion 2"]
+
+
+def test_notion_split_across_chunks_is_merged():
+    merged = merge_sections([
+        [{"section": "Notion 2 : Limites", "summary": "Début.", "qcm": [{"question": "q1"}]}],
+        [{"section": "Notion 1 : Limites", "summary": "Suite.", "qcm": [{"question": "q2"}]}],
+    ])
+
+    assert len(merged) == 1
+    assert merged[0]["section"] == "Notion 1 : Limites"
+    assert merged[0]["summary"] == "Début. Suite."
+    assert merged[0]["qcm"] == [{"question": "q1"}, {"question": "q2"}]
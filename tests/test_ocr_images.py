@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("fitz")
+pytest.importorskip("cv2")
+
+from utils import pdf_preprocessing
+
+
+def _box(x, y, width=40, height=10):
+    return [[x, y], [x + width, y], [x + width, y + height], [x, y + height]]
+
+
+class StubEngine:
+    # Détection : une boîte par ligne déclarée pour la page (hauteur de
+    # l'image = identifiant de la page) ; reconnaissance : texte numéroté
+    def __init__(self, lines_per_page, nested=True):
+        self.lines_per_page = lines_per_page
+        self.nested = nested
+        self.recognized = []
+
+    def ocr(self, img, det=True, rec=True, cls=True):
+        if det:
+            page = img.shape[0] - 100
+            return [[_box(5, 20 * line) for line in range(self.lines_per_page[page])]]
+        crops = img[0]
+        results = [(f"ligne {len(self.recognized) + index}", 0.9) for index in range(len(crops))]
+        self.recognized += results
+        # PaddleOCR 2.7+ : une liste de résultats par image passée ; 2.6 : liste plate
+        return [results] if self.nested else results
+
+
+@pytest.mark.parametrize("nested", [True, False])
+def test_every_detected_line_reaches_its_page(monkeypatch, nested):
+    engine = StubEngine([3, 0, 2], nested=nested)
+    monkeypatch.setattr(pdf_preprocessing, "get_ocr_engine", lambda lang: engine)
+    images = [np.zeros((100 + page, 200, 3), dtype=np.uint8) for page in range(3)]
+
+    texts = pdf_preprocessing.ocr_images(images)
+
+    assert texts == ["ligne 0\nligne 1\nligne 2\n", "", "ligne 3\nligne 4\n"]
+
+
+def test_mismatched_recognition_count_is_an_error(monkeypatch):
+    engine = StubEngine([2])
+    engine.ocr = lambda img, det=True, rec=True, cls=True: (
+        [[_box(5, 0), _box(5, 20)]] if det else [[("seule", 0.9)]])
+    monkeypatch.setattr(pdf_preprocessing, "get_ocr_engine", lambda lang: engine)
+
+    with pytest.raises(RuntimeError):
+        pdf_preprocessing.ocr_images([np.zeros((100, 200, 3), dtype=np.uint8)])
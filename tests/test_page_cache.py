@@ -0,0 +1,74 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("cv2")
+
+from utils import extraction_cache
+from utils.extraction_cache import ExtractionCache, page_fingerprint
+from utils.pdf_preprocessing import extract_text_from_pdf
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(extraction_cache, "_default_cache", cache)
+    return cache
+
+
+def _write_pdf(path, texts):
+    doc = fitz.open()
+    for text in texts:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+
+
+def test_page_lookups_are_not_counted_in_stats(tmp_path, cache):
+    first, second = tmp_path / "v1.pdf", tmp_path / "v2.pdf"
+    _write_pdf(first, ["Introduction aux suites", "Limites et continuité", "Dérivées usuelles"])
+    _write_pdf(second, ["Introduction aux suites", "Limites, continuité et asymptotes", "Dérivées usuelles"])
+
+    extract_text_from_pdf(str(first), ocr_if_needed=False, workers=1)
+    pages = extract_text_from_pdf(str(second), ocr_if_needed=False, workers=1)
+
+    assert "asymptotes" in pages[1] and "Dérivées" in pages[2]
+    # Une consultation par document ; les pages reprises ne comptent pas
+    assert cache.stats()["misses"] == 2 and cache.stats()["hits"] == 0
+    extract_text_from_pdf(str(second), ocr_if_needed=False, workers=1)
+    assert cache.stats()["hits"] == 1
+
+
+def _write_form_pdf(path, text):
+    # Page qui dessine une autre page sous forme de Form XObject : flux de
+    # contenu identique (« q /fzFrm0 Do Q ») quel que soit le texte
+    source = fitz.open()
+    source.new_page().insert_text((72, 72), text)
+    doc = fitz.open()
+    page = doc.new_page()
+    page.show_pdf_page(page.rect, source, 0)
+    doc.save(str(path))
+    doc.close()
+    source.close()
+
+
+def test_form_pages_with_different_content_do_not_collide(tmp_path, cache):
+    first, second = tmp_path / "alpha.pdf", tmp_path / "beta.pdf"
+    _write_form_pdf(first, "Alpha : cours de mathématiques")
+    _write_form_pdf(second, "Beta : cours de physique")
+
+    with fitz.open(str(first)) as a, fitz.open(str(second)) as b:
+        assert a[0].read_contents() == b[0].read_contents()
+        assert page_fingerprint(a, a[0]) != page_fingerprint(b, b[0])
+
+    assert "Alpha" in extract_text_from_pdf(str(first), ocr_if_needed=False, workers=1)[0]
+    assert "Beta" in extract_text_from_pdf(str(second), ocr_if_needed=False, workers=1)[0]
+
+
+def test_unchanged_page_keeps_its_fingerprint(tmp_path):
+    first, second = tmp_path / "v1.pdf", tmp_path / "v2.pdf"
+    _write_pdf(first, ["Introduction aux suites", "Limites"])
+    _write_pdf(second, ["Un nouveau préambule", "Introduction aux suites", "Limites"])
+
+    with fitz.open(str(first)) as a, fitz.open(str(second)) as b:
+        assert page_fingerprint(a, a[0]) == page_fingerprint(b, b[1])
+        assert page_fingerprint(a, a[0]) != page_fingerprint(b, b[0])
@@ -0,0 +1,32 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("cv2")
+
+from utils.pdf_preprocessing import MIN_WORD_RATIO, ocr_dpi_for_page, score_page_text
+
+FORMULA_PARAGRAPH = (
+    "Soit f(x)=x²+2x+1. On calcule la dérivée f'(x)=2x+2 pour tout x∈ℝ. "
+    "La suite a_n=1/n converge vers 0. L'équation différentielle dy/dx=ky "
+    "admet pour solutions y=Ce^(kx) avec C∈ℝ. "
+) * 6
+
+
+@pytest.fixture
+def page():
+    with fitz.open() as doc:
+        yield doc.new_page()
+
+
+def test_formula_tokens_do_not_lower_word_ratio(page):
+    assert score_page_text(page, FORMULA_PARAGRAPH)["word_ratio"] >= MIN_WORD_RATIO
+
+
+def test_formula_page_with_good_text_layer_skips_ocr(page):
+    assert ocr_dpi_for_page(page, FORMULA_PARAGRAPH) is None
+
+
+def test_garbled_text_layer_still_goes_to_ocr(page):
+    # Police mal encodée : caractères de remplacement à la place des lettres
+    garbled = "D\ufffdriv\ufffde d'une fonction \ufffd\ufffd\ufffd \ufffd\ufffd " * 40
+    assert ocr_dpi_for_page(page, garbled) is not None
@@ -0,0 +1,73 @@
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("cv2")
+
+from utils import pdf_preprocessing
+from utils.pdf_preprocessing import extract_text_from_pdf
+
+PAGE_TEXTS = [f"Page {n} : suites et séries" for n in range(8)]
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "cours.pdf"
+    doc = fitz.open()
+    for text in PAGE_TEXTS:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def _extract(pdf_path):
+    return extract_text_from_pdf(pdf_path, ocr_if_needed=False, use_cache=False, workers=2)
+
+
+def test_dead_worker_does_not_break_later_extractions(pdf_path):
+    pool = pdf_preprocessing._get_process_pool(2)
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(os._exit, 1).result()
+
+    for _ in range(2):
+        assert [page.strip() for page in _extract(pdf_path)] == PAGE_TEXTS
+
+
+class _FakePool:
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def _fake_submit(failures):
+    # Les `failures` premières tranches échouent comme si le processus était mort
+    calls = []
+
+    def submit(workers, fn, *args):
+        future = Future()
+        if len(calls) < failures:
+            future.set_exception(BrokenProcessPool("processus de travail mort"))
+        else:
+            future.set_result(fn(*args))
+        calls.append(args[1])
+        return _FakePool(), future
+
+    return submit, calls
+
+
+def test_broken_shard_is_retried_on_a_new_pool(pdf_path, monkeypatch):
+    submit, calls = _fake_submit(failures=1)
+    monkeypatch.setattr(pdf_preprocessing, "_submit_to_pool", submit)
+
+    assert [page.strip() for page in _extract(pdf_path)] == PAGE_TEXTS
+    assert calls.count(calls[0]) == 2
+
+
+def test_second_failure_falls_back_to_sequential_extraction(pdf_path, monkeypatch):
+    submit, _ = _fake_submit(failures=100)
+    monkeypatch.setattr(pdf_preprocessing, "_submit_to_pool", submit)
+
+    assert [page.strip() for page in _extract(pdf_path)] == PAGE_TEXTS
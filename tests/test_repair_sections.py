@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+pytest.importorskip("azure.ai.inference")
+
+from utils import structuring
+from utils.section_schema import parse_sections
+
+COURSE = "Chapitre 2. Les dérivées\nLa dérivée de x² est 2x."
+
+
+@pytest.fixture
+def model(monkeypatch):
+    # Faux client : renvoie les réponses prévues, dans l'ordre des requêtes,
+    # et garde les prompts reçus
+    prompts = []
+    replies = []
+
+    def complete_each(conversations, **params):
+        for index, messages in enumerate(conversations):
+            prompts.append(messages[-1].content)
+            yield index, replies.pop(0), None
+
+    monkeypatch.setattr(structuring, "complete_each", complete_each)
+    monkeypatch.setattr(structuring, "count_tokens", lambda text: len(text.split()))
+    return prompts, replies
+
+
+def test_repair_prompt_carries_the_source_chunk(model):
+    prompts, replies = model
+    replies.append('[{"section": "Dérivées", "summary": "Dérivée de x²."}]')
+    parsed = parse_sections('[{"section": "Intro", "summary": "s"}, {"section": "Dérivées", "summ')
+
+    sections = structuring.repair_sections([parsed], [COURSE], use_cache=False)[0]
+
+    assert [section["section"] for section in sections] == ["Intro", "Dérivées"]
+    assert len(prompts) == 1
+    assert COURSE in prompts[0] and "objet JSON tronqué" in prompts[0]
+
+
+def test_repair_can_drop_a_fragment_with_no_source(model):
+    prompts, replies = model
+    replies.append("```json\n[]\n```")
+
+    sections = structuring.parse_responses(["Je ne peux pas structurer ce cours."], [COURSE], use_cache=False)
+
+    assert sections == [[]]
+    assert COURSE in prompts[0]
+
+
+def test_unrepairable_fragment_is_retried_then_dropped(model):
+    prompts, replies = model
+    replies += ["toujours pas de JSON"] * structuring.REPAIR_MAX_ATTEMPTS
+    parsed = parse_sections('[{"section": "Intro", "summary": "s"}, {"section": "Dérivées"}]')
+
+    sections = structuring.repair_sections([parsed], [COURSE], use_cache=False)[0]
+
+    assert [section["section"] for section in sections] == ["Intro"]
+    assert len(prompts) == structuring.REPAIR_MAX_ATTEMPTS
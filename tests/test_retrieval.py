@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from utils import retrieval
+from utils.retrieval import HashingEmbedder, RetrievalStore, pdf_index_key, split_pages
+
+PAGES = [
+    "Les suites numériques : une suite converge si ses termes se rapprochent d'une limite.",
+    "La dérivée d'une fonction mesure sa variation instantanée ; dérivée d'un produit.",
+    "Une intégrale calcule l'aire sous la courbe ; primitive et intégrale définie.",
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return RetrievalStore(index_dir=str(tmp_path / "retrieval"))
+
+
+def test_split_pages_overlaps_without_crossing_pages():
+    pages = [" ".join(f"a{i}" for i in range(10)), "b0 b1 b2"]
+    chunks = split_pages(pages, chunk_words=4, overlap=1)
+
+    assert chunks[0] == (0, "a0 a1 a2 a3")
+    assert chunks[1] == (0, "a3 a4 a5 a6")
+    assert chunks[-1] == (1, "b0 b1 b2")
+    assert all(page == 0 for page, _ in chunks[:-1])
+
+
+def test_search_returns_the_matching_page(store):
+    index = store.get_index(PAGES, HashingEmbedder(dim=256))
+    hits = index.search("dérivée d'un produit", k=2)
+
+    assert hits[0]["page"] == 1
+    assert hits[0]["score"] >= hits[1]["score"]
+    assert index.search("   ") == []
+
+
+def test_index_is_found_by_pdf_key(store):
+    embedder = HashingEmbedder(dim=256)
+    key = pdf_index_key("abc", embedder, parser_version=1)
+
+    assert store.find_index(key, embedder) is None
+    store.get_index(PAGES, embedder, key=key)
+    reopened = RetrievalStore(index_dir=store.index_dir).find_index(key, embedder)
+    assert reopened is not None and len(reopened) == len(PAGES)
+
+
+def test_ivf_search_finds_exact_duplicates(store, monkeypatch):
+    monkeypatch.setattr(retrieval, "IVF_MIN_CHUNKS", 10)
+    pages = [f"page {n} thème{n % 7} notion{n} exemple{n * 3}" for n in range(60)]
+    index = store.get_index(pages, HashingEmbedder(dim=128))
+
+    assert index.centroids is not None
+    for n in (0, 17, 42):
+        assert index.search(pages[n], k=1, nprobe=len(index.centroids))[0]["page"] == n
@@ -0,0 +1,59 @@
+from utils.section_schema import check_section, parse_sections, validate_section
+
+VALID = '{"section": "Dérivées", "summary": "Règles de calcul.", "related_elements": ["image_page2_1.png"]}'
+QCM = {"question": "Dérivée de x² ?", "choices": ["2x", "x"], "answer": "2x"}
+
+
+def test_validate_section_reports_missing_fields():
+    section, errors = validate_section({"section": "Dérivées", "summary": "  ", "related_elements": "img.png"})
+
+    assert section is None
+    assert "« summary » manquant ou vide" in errors
+    assert any("related_elements" in error for error in errors)
+
+
+def test_validate_section_checks_activities():
+    base = {"section": "Dérivées", "summary": "Règles."}
+    assert validate_section(base)[0] == {**base, "related_elements": []}
+    assert validate_section(base, require_activities=True)[0] is None
+
+    section, errors = validate_section({**base, "qcm": [{**QCM, "answer": "3x"}], "glossary": [], "flashcards": []},
+                                       require_activities=True)
+    assert section is None and errors == ["qcm[0] : « answer » doit reprendre l'un des choix"]
+    section, _ = validate_section({**base, "qcm": [QCM], "glossary": [], "flashcards": []}, require_activities=True)
+    assert section["qcm"] == [QCM]
+
+
+def test_check_section_accepts_python_literals():
+    section, raw, errors = check_section("{'section': 'Dérivées', 'summary': 'Règles.', 'related_elements': []}")
+
+    assert section == {"section": "Dérivées", "summary": "Règles.", "related_elements": []}
+    assert errors == []
+    assert check_section('{"section": "Dérivées", "summary": ')[2] == ["JSON mal formé"]
+
+
+def test_parse_sections_skips_bracketed_preamble():
+    text = 'Voici le découpage [Introduction, Notions, Conclusion] :\n[{"section": "A", "summary": "s"}]'
+
+    assert [section for section, _, _ in parse_sections(text)] == [
+        {"section": "A", "summary": "s", "related_elements": []}]
+
+
+def test_parse_sections_keeps_valid_elements_and_flags_the_others():
+    text = f'```json\n[{VALID}, {{"section": "Intégrales"}}, {{"section": "Suites", "summ'
+    pieces = parse_sections(text)
+
+    assert pieces[0][0]["section"] == "Dérivées"
+    assert pieces[1][0] is None and pieces[1][2] == ["« summary » manquant ou vide"]
+    assert pieces[2][0] is None and pieces[2][2] == ["objet JSON tronqué"]
+
+
+def test_parse_sections_never_returns_nothing_for_a_non_empty_response():
+    assert parse_sections("   ") == []
+    for text in ("[]", "Je ne peux pas structurer ce cours.", "```\n[ ]\n```"):
+        pieces = parse_sections(text)
+        assert len(pieces) == 1 and pieces[0][0] is None and pieces[0][2]
+
+
+def test_parse_sections_accepts_a_single_object():
+    assert parse_sections(VALID)[0][0]["related_elements"] == ["image_page2_1.png"]
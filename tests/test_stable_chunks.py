@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+pytest.importorskip("tiktoken")
+pytest.importorskip("azure.ai.inference")
+
+from utils import structuring
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # Pas de téléchargement de l'encodage tiktoken : un token par mot
+    monkeypatch.setattr(structuring, "count_tokens", lambda text: len(text.split()))
+
+
+def _unheaded_lines(count):
+    rng = random.Random(0)
+    words = ["fonction", "dérivée", "limite", "intégrale", "suite", "série", "continue", "borne"]
+    return [" ".join(rng.choice(words) for _ in range(12)) + f" ({index})" for index in range(count)]
+
+
+def test_insertion_in_unheaded_text_keeps_other_chunks():
+    lines = _unheaded_lines(1200)
+    before = structuring.split_into_stable_chunks("\n".join(lines), 2000)
+    edited = lines[:600] + ["Une phrase ajoutée au milieu du cours."] + lines[600:]
+    after = structuring.split_into_stable_chunks("\n".join(edited), 2000)
+
+    assert len(before) > 3
+    assert "\n".join(before) == "\n".join(lines)
+    assert len(set(before) - set(after)) == 1
+
+
+def test_page_list_is_reassembled_in_order():
+    lines = _unheaded_lines(400)
+    pages = ["\n".join(lines[start:start + 40]) for start in range(0, len(lines), 40)]
+    chunks = structuring.split_into_stable_chunks(pages, 2000)
+
+    assert "\n".join(chunks) == "\n".join(pages)
+    assert all(len(chunk.split()) <= 2000 for chunk in chunks)
@@ -0,0 +1,305 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from utils.sqlite_utils import closing_transaction
+
+# Contenu structuré des cours (sections, QCM, glossaire, flashcards) conservé
+# dans une base SQLite locale, indexée par empreinte du PDF : un cours déjà
+# traité est restitué par une requête, sans nouvelle extraction ni appel au
+# modèle. Les images et tableaux cités sont copiés dans CONTENT_FILES_DIR
+# (temp_files est nettoyé périodiquement).
+CONTENT_DB_PATH = os.getenv("CONTENT_DB_PATH", "./data/content.sqlite3")
+CONTENT_FILES_DIR = os.getenv("CONTENT_FILES_DIR", "./data/files")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    name TEXT,
+    image_manifest TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (sha256, variant)
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    UNIQUE (document_id, position)
+);
+CREATE INDEX IF NOT EXISTS sections_title ON sections (title);
+CREATE TABLE IF NOT EXISTS section_elements (
+    section_id INTEGER NOT NULL REFERENCES sections (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT,
+    PRIMARY KEY (section_id, position)
+);
+CREATE TABLE IF NOT EXISTS qcm (
+    section_id INTEGER NOT NULL REFERENCES sections (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    choices TEXT NOT NULL,
+    answer TEXT,
+    PRIMARY KEY (section_id, position)
+);
+CREATE TABLE IF NOT EXISTS glossary (
+    id INTEGER PRIMARY KEY,
+    section_id INTEGER NOT NULL REFERENCES sections (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    definition TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS glossary_section ON glossary (section_id, position);
+CREATE INDEX IF NOT EXISTS glossary_term ON glossary (term COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS flashcards (
+    section_id INTEGER NOT NULL REFERENCES sections (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    front TEXT NOT NULL,
+    back TEXT NOT NULL,
+    PRIMARY KEY (section_id, position)
+);
+"""
+
+# Index plein texte des résumés de sections et des termes du glossaire
+# (accents ignorés). kind : « section » ou « glossary », ref_id : identifiant
+# de la ligne correspondante.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS content_fts USING fts5 (
+    kind UNINDEXED,
+    ref_id UNINDEXED,
+    document_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def content_variant(prompt, with_tables=True):
+    # Variante d'un même PDF : gabarit de prompt, avec ou sans tableaux
+    return prompt if with_tables else f"{prompt}-sans-tableaux"
+
+
+def is_complete(sections):
+    # Résultat à conserver : au moins une section, et aucune dont les
+    # exercices n'ont pu être générés. Sinon le cours est regénéré à la
+    # prochaine demande (les réponses valides sont reprises du cache du modèle).
+    return bool(sections) and not any(section.get("incomplete") for section in sections)
+
+
+def _text(value):
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+class ContentStore:
+    def __init__(self, db_path=CONTENT_DB_PATH, files_dir=CONTENT_FILES_DIR):
+        self.db_path = db_path
+        self.files_dir = files_dir
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        os.makedirs(files_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # SQLite compilé sans FTS5 : recherche par LIKE
+                self.fts = False
+        finally:
+            conn.close()
+
+    def _connect(self, write=True):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return closing_transaction(conn, write)
+
+    def _store_file(self, sha256, path):
+        # Copie un fichier produit par l'extraction dans le dossier du document
+        if not path or not os.path.exists(path):
+            return None
+        target_dir = os.path.join(self.files_dir, sha256)
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(path))
+        if os.path.abspath(target) != os.path.abspath(path):
+            shutil.copyfile(path, target)
+        return target
+
+    def save_document(self, sha256, variant, sections, image_manifest=None, name=None, element_paths=None):
+        # Remplace le contenu enregistré pour ce PDF et cette variante
+        # (gabarit de prompt, avec ou sans tableaux). Renvoie l'identifiant du document.
+        # element_paths : élément cité -> fichier écrit par l'extraction
+        # (document_parser.element_paths)
+        stored_paths = {}
+        manifest = []
+        for entry in image_manifest or []:
+            stored = self._store_file(sha256, entry["path"])
+            stored_paths[entry["path"]] = stored
+            manifest.append({**entry, "path": stored or entry["path"]})
+
+        with self._connect() as conn:
+            if self.fts:
+                conn.execute(
+                    "DELETE FROM content_fts WHERE document_id IN "
+                    "(SELECT id FROM documents WHERE sha256 = ? AND variant = ?)",
+                    (sha256, variant),
+                )
+            conn.execute("DELETE FROM documents WHERE sha256 = ? AND variant = ?", (sha256, variant))
+            document_id = conn.execute(
+                "INSERT INTO documents (sha256, variant, name, image_manifest, created_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, variant, name, json.dumps(manifest, ensure_ascii=False), time.time()),
+            ).lastrowid
+
+            for position, section in enumerate(sections):
+                title = _text(section.get("section", ""))
+                summary = _text(section.get("summary", ""))
+                section_id = conn.execute(
+                    "INSERT INTO sections (document_id, position, title, summary) VALUES (?, ?, ?, ?)",
+                    (document_id, position, title, summary),
+                ).lastrowid
+                if self.fts:
+                    conn.execute(
+                        "INSERT INTO content_fts (kind, ref_id, document_id, title, body) VALUES (?, ?, ?, ?, ?)",
+                        ("section", section_id, document_id, title, summary),
+                    )
+
+                for index, elem in enumerate(section.get("related_elements") or []):
+                    source = (element_paths or {}).get(elem) if isinstance(elem, str) else None
+                    path = stored_paths.get(source) or self._store_file(sha256, source)
+                    conn.execute(
+                        "INSERT INTO section_elements (section_id, position, name, path) VALUES (?, ?, ?, ?)",
+                        (section_id, index, _text(elem), path),
+                    )
+                # Les éléments mal formés renvoyés par le modèle sont ignorés
+                for index, q in enumerate(item for item in section.get("qcm") or [] if isinstance(item, dict)):
+                    conn.execute(
+                        "INSERT INTO qcm (section_id, position, question, choices, answer) VALUES (?, ?, ?, ?, ?)",
+                        (section_id, index, _text(q.get("question", "")),
+                         json.dumps(q.get("choices") or [], ensure_ascii=False), q.get("answer")),
+                    )
+                for index, g in enumerate(item for item in section.get("glossary") or [] if isinstance(item, dict)):
+                    term, definition = _text(g.get("term", "")), _text(g.get("definition", ""))
+                    glossary_id = conn.execute(
+                        "INSERT INTO glossary (section_id, position, term, definition) VALUES (?, ?, ?, ?)",
+                        (section_id, index, term, definition),
+                    ).lastrowid
+                    if self.fts:
+                        conn.execute(
+                            "INSERT INTO content_fts (kind, ref_id, document_id, title, body) VALUES (?, ?, ?, ?, ?)",
+                            ("glossary", glossary_id, document_id, term, definition),
+                        )
+                for index, f in enumerate(item for item in section.get("flashcards") or [] if isinstance(item, dict)):
+                    conn.execute(
+                        "INSERT INTO flashcards (section_id, position, front, back) VALUES (?, ?, ?, ?)",
+                        (section_id, index, _text(f.get("front", "")), _text(f.get("back", ""))),
+                    )
+        return document_id
+
+    def get_document(self, sha256, variant):
+        # Contenu enregistré, au format produit par le modèle ({"sections",
+        # "image_manifest", "element_paths"}), ou None
+        with self._connect(write=False) as conn:
+            document = conn.execute(
+                "SELECT * FROM documents WHERE sha256 = ? AND variant = ?", (sha256, variant)
+            ).fetchone()
+            if document is None:
+                return None
+            rows = conn.execute(
+                "SELECT id, title, summary FROM sections WHERE document_id = ? ORDER BY position", (document["id"],)
+            ).fetchall()
+            section_ids = [row["id"] for row in rows]
+            children = {}
+            for table, columns in (("section_elements", "name, path"), ("qcm", "question, choices, answer"),
+                                   ("glossary", "term, definition"), ("flashcards", "front, back")):
+                children[table] = {}
+                for child in conn.execute(
+                    f"SELECT section_id, {columns} FROM {table} WHERE section_id IN "
+                    f"(SELECT id FROM sections WHERE document_id = ?) ORDER BY section_id, position",
+                    (document["id"],),
+                ):
+                    children[table].setdefault(child["section_id"], []).append(child)
+
+        sections = []
+        element_paths = {}
+        for row, section_id in zip(rows, section_ids):
+            elements = children["section_elements"].get(section_id, [])
+            for elem in elements:
+                if elem["path"]:
+                    element_paths[elem["name"]] = elem["path"]
+            section = {
+                "section": row["title"],
+                "summary": row["summary"],
+                "related_elements": [elem["name"] for elem in elements],
+            }
+            if section_id in children["qcm"]:
+                section["qcm"] = [{"question": q["question"], "choices": json.loads(q["choices"]), "answer": q["answer"]}
+                                  for q in children["qcm"][section_id]]
+            if section_id in children["glossary"]:
+                section["glossary"] = [{"term": g["term"], "definition": g["definition"]}
+                                       for g in children["glossary"][section_id]]
+            if section_id in children["flashcards"]:
+                section["flashcards"] = [{"front": f["front"], "back": f["back"]}
+                                         for f in children["flashcards"][section_id]]
+            sections.append(section)
+
+        return {
+            "sections": sections,
+            "image_manifest": json.loads(document["image_manifest"]),
+            "element_paths": element_paths,
+        }
+
+    def search(self, query, limit=20):
+        # Recherche dans les résumés de sections et le glossaire de tous les cours
+        with self._connect(write=False) as conn:
+            if self.fts:
+                # Chaque mot est cherché comme préfixe (« dériv » trouve « dérivées »),
+                # sans interpréter de syntaxe FTS5 venant de l'utilisateur
+                terms = " ".join('"' + word.replace('"', '""') + '"*' for word in query.split())
+                if not terms:
+                    return []
+                rows = conn.execute(
+                    "SELECT content_fts.kind, content_fts.ref_id, content_fts.title, "
+                    "snippet(content_fts, 4, '[', ']', '…', 12) AS snippet, documents.sha256, documents.name "
+                    "FROM content_fts JOIN documents ON documents.id = content_fts.document_id "
+                    "WHERE content_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (terms, limit),
+                ).fetchall()
+            else:
+                pattern = f"%{query}%"
+                rows = conn.execute(
+                    "SELECT 'section' AS kind, sections.id AS ref_id, sections.title, sections.summary AS snippet, "
+                    "documents.sha256, documents.name "
+                    "FROM sections JOIN documents ON documents.id = sections.document_id "
+                    "WHERE sections.summary LIKE ? OR sections.title LIKE ? "
+                    "UNION ALL "
+                    "SELECT 'glossary', glossary.id, glossary.term, glossary.definition, documents.sha256, documents.name "
+                    "FROM glossary JOIN sections ON sections.id = glossary.section_id "
+                    "JOIN documents ON documents.id = sections.document_id "
+                    "WHERE glossary.term LIKE ? OR glossary.definition LIKE ? LIMIT ?",
+                    (pattern, pattern, pattern, pattern, limit),
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_content_store() -> ContentStore:
+    # Base partagée par toutes les sessions du processus
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ContentStore()
+        return _default_store
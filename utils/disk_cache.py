@@ -0,0 +1,86 @@
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+# Outils communs aux caches disque (extraction, réponses du modèle, index de
+# recherche) : une entrée est un fichier ou un dossier du cache, publiée par
+# renommage atomique ; l'heure de modification d'un fichier témoin de
+# l'entrée sert d'horodatage LRU.
+
+
+def dir_size(path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def staged(cache_dir, target):
+    # Chemin temporaire (fichier ou dossier, créé par l'appelant) renommé en
+    # `target` à la sortie du bloc, pour qu'un lecteur concurrent ne voie
+    # jamais une entrée à moitié écrite. Si une autre session a déjà publié
+    # ce dossier, la copie est abandonnée.
+    tmp_path = os.path.join(cache_dir, f".tmp-{uuid.uuid4().hex}")
+    try:
+        yield tmp_path
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    try:
+        os.replace(tmp_path, target)
+    except OSError:
+        _remove(tmp_path)
+
+
+def mark_used(path):
+    # Marque l'entrée comme récemment utilisée
+    os.utime(path, None)
+
+
+def evict(cache_dir, max_size, stamp_name=None, max_age=None, keep=()):
+    # Entrées : fichiers de `cache_dir`, ou dossiers contenant `stamp_name`
+    # (fichier témoin). Supprime les entrées les moins récemment utilisées
+    # jusqu'à repasser sous `max_size` octets, ainsi que celles inutilisées
+    # depuis plus de `max_age` secondes. Les entrées de `keep` sont comptées
+    # mais jamais supprimées (ex. entrée qui vient d'être écrite).
+    now = time.time()
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if name.startswith("."):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            if stamp_name is None:
+                stat = os.stat(path)
+                mtime, size = stat.st_mtime, stat.st_size
+            else:
+                mtime, size = os.path.getmtime(os.path.join(path, stamp_name)), dir_size(path)
+        except OSError:
+            continue
+        total += size
+        if path not in keep:
+            entries.append((mtime, size, path))
+
+    for mtime, size, path in sorted(entries):
+        if total <= max_size and (max_age is None or now - mtime <= max_age):
+            break
+        _remove(path)
+        total -= size
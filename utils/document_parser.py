@@ -0,0 +1,223 @@
+import fitz  # PyMuPDF
+import pdfplumber  # Pour extraire les tableaux en format PDF
+import csv  # Pour sauvegarder les tableaux en CSV
+import hashlib
+import logging
+import os
+
+from utils.extraction_cache import cache_key, get_extraction_cache, pdf_hash
+from utils.instrumentation import count, timed, track_document
+from utils.layout import page_text_in_reading_order
+
+# Version de l'analyse, incluse dans la clé du cache
+PARSER_VERSION = 5
+# Nombre minimal de traits horizontaux et verticaux pour chercher des tableaux sur une page
+MIN_TABLE_RULINGS = 2
+# Dossier par défaut des images et tableaux extraits
+OUTPUT_DIR = "temp_files"
+
+# Appelé depuis l'interface, les travaux en arrière-plan et ingest.py : les
+# erreurs d'extraction sont journalisées plutôt qu'affichées
+logger = logging.getLogger("e_learning.extraction")
+
+
+# Fonction pour extraire le texte, les images, les tableaux et les formules du PDF
+# Le résultat est mis en cache par empreinte du PDF : un cours déjà traité
+# (même par une autre session) est restitué sans être ré-analysé.
+# Le texte est renvoyé page par page (liste), pour que la structuration et
+# l'index de recherche gardent les frontières de pages.
+def extract_text_images_tables(pdf_path, use_cache=True, output_dir=OUTPUT_DIR):
+    with track_document("text_images_tables", os.path.basename(str(pdf_path))):
+        if use_cache:
+            cache = get_extraction_cache()
+            with timed("cache_lookup"):
+                key = cache_key(pdf_hash(pdf_path), "text_images_tables", version=PARSER_VERSION,
+                                output_dir=output_dir)
+                cached = cache.get(key)
+            if cached is not None:
+                count("cache_hits")
+                return (cached["page_texts"], cached["images"], cached["tables"], cached["math_formulas"],
+                        cached["image_manifest"])
+
+        page_texts, images, table_files, math_formulas, image_manifest, tables_complete = (
+            _extract_text_images_tables(pdf_path, output_dir))
+
+        # Résultat sans tableaux après une erreur de pdfplumber : renvoyé mais
+        # pas mis en cache, la prochaine extraction retentera les tableaux
+        if use_cache and tables_complete:
+            with timed("cache_store"):
+                cache.put(
+                    key,
+                    {"page_texts": page_texts, "images": images, "tables": table_files, "math_formulas": math_formulas,
+                     "image_manifest": image_manifest},
+                    files=images + table_files,
+                )
+
+        return page_texts, images, table_files, math_formulas, image_manifest
+
+
+# Fonction pour extraire le texte et les images du PDF (sans tableaux ni formules)
+def extract_text_images(pdf_path, output_dir=OUTPUT_DIR):
+    page_texts = []
+    images = []
+    image_manifest = []
+
+    with track_document("text_images", os.path.basename(str(pdf_path))), fitz.open(pdf_path) as doc:
+        count("pages", len(doc))
+        saved_images = {}
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            with timed("text_layer"):
+                page_texts.append(page_text_in_reading_order(page))
+            with timed("images"):
+                images += _save_page_images(doc, page, page_num, saved_images, image_manifest, output_dir)
+
+    return page_texts, images, image_manifest
+
+
+def _save_page_images(doc, page, page_num, saved_images, image_manifest, output_dir=OUTPUT_DIR):
+    # Enregistre les images de la page qui n'ont pas encore été vues dans le
+    # document. Un logo ou un en-tête répété sur chaque page (même xref, ou
+    # même contenu sous un autre xref) n'est écrit qu'une fois ; le manifeste
+    # garde la liste des pages et des noms qui y font référence.
+    # saved_images associe les xref et les empreintes de contenu à leur
+    # entrée du manifeste (None pour les images ignorées, ex. CMJN).
+    new_paths = []
+    img_list = page.get_images(full=True)
+    for img_index, img in enumerate(img_list):
+        xref = img[0]
+        img_name = f"image_page{page_num+1}_{img_index+1}.png"
+
+        if xref in saved_images:
+            entry = saved_images[xref]
+        else:
+            # Empreinte du flux brut (compressé) : pas besoin de décoder l'image
+            content_hash = hashlib.sha256(doc.xref_stream_raw(xref) or b"").hexdigest()
+            entry = saved_images.get(content_hash)
+            if content_hash not in saved_images:
+                pix = fitz.Pixmap(doc, xref)
+                if pix.n < 5:  # C'est du GRAY ou RGB
+                    img_path = os.path.join(output_dir, img_name)
+                    pix.save(img_path)
+                    count("images_written")
+                    count("bytes_written", os.path.getsize(img_path))
+                    new_paths.append(img_path)
+                    entry = {"path": img_path, "sha256": content_hash, "pages": [], "aliases": []}
+                    image_manifest.append(entry)
+                pix = None
+                saved_images[content_hash] = entry
+            saved_images[xref] = entry
+
+        if entry is not None:
+            if page_num + 1 not in entry["pages"]:
+                entry["pages"].append(page_num + 1)
+            if img_name != os.path.basename(entry["path"]):
+                entry["aliases"].append(img_name)
+
+    return new_paths
+
+
+def resolve_element(elem, image_manifest, directory=OUTPUT_DIR):
+    # Chemin du fichier correspondant à un élément cité par le modèle
+    # (ex. « image_page3_1.png »), y compris quand cette image est un doublon
+    # enregistré sous le nom de sa première occurrence
+    for entry in image_manifest or []:
+        if elem in entry["aliases"]:
+            return entry["path"]
+    return os.path.join(directory, elem)
+
+
+def element_paths(sections, image_manifest, directory=OUTPUT_DIR):
+    # Fichier de chaque élément cité par les sections (nom -> chemin)
+    return {
+        elem: resolve_element(elem, image_manifest, directory)
+        for section in sections
+        for elem in section.get("related_elements") or []
+        if isinstance(elem, str)
+    }
+
+
+def _has_ruling_lines(page):
+    # pdfplumber (stratégie par défaut « lines ») ne trouve que des tableaux
+    # délimités par des traits : une page sans traits horizontaux ET
+    # verticaux n'a pas besoin de passer par la détection de tableaux
+    horizontal = vertical = 0
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.y - p2.y) < 1:
+                    horizontal += 1
+                elif abs(p1.x - p2.x) < 1:
+                    vertical += 1
+            elif item[0] == "re":
+                rect = item[1]
+                if rect.height < 2:
+                    horizontal += 1
+                elif rect.width < 2:
+                    vertical += 1
+                else:
+                    horizontal += 2
+                    vertical += 2
+        if horizontal >= MIN_TABLE_RULINGS and vertical >= MIN_TABLE_RULINGS:
+            return True
+    return False
+
+
+def _extract_text_images_tables(pdf_path, output_dir=OUTPUT_DIR):
+    page_texts = []
+    images = []
+    math_formulas = []  # Pour les formules mathématiques (LaTeX)
+    table_pages = []  # Pages dont la mise en page suggère des tableaux
+    image_manifest = []  # Images uniques et pages qui y font référence
+    saved_images = {}
+
+    # Un seul passage PyMuPDF : texte (lu une fois par page), images, formules
+    # et repérage des pages susceptibles de contenir des tableaux
+    with fitz.open(pdf_path) as doc:
+        count("pages", len(doc))
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            with timed("text_layer"):
+                page_text = page_text_in_reading_order(page)
+            page_texts.append(page_text)
+
+            # Extraction des images (schémas), chacune enregistrée une seule fois
+            with timed("images"):
+                images += _save_page_images(doc, page, page_num, saved_images, image_manifest, output_dir)
+
+            # Extraction des formules mathématiques (en recherchant le texte qui ressemble à LaTeX)
+            math_formulas += [line for line in page_text.split('\n') if '$' in line]
+
+            with timed("table_detection"):
+                if _has_ruling_lines(page):
+                    table_pages.append(page_num)
+
+    # Extraction des tableaux avec pdfplumber et sauvegarde en CSV, limitée
+    # aux pages repérées (le fichier n'est rouvert que s'il y en a)
+    table_files = []  # Liste pour stocker les chemins des fichiers CSV
+    tables_complete = True
+
+    if table_pages:
+        count("table_pages", len(table_pages))
+        try:
+            with timed("tables"), pdfplumber.open(pdf_path) as pdf:
+                for page_num in table_pages:
+                    # Utiliser pdfplumber pour extraire les tableaux
+                    page_tables = pdf.pages[page_num].extract_tables()
+                    if page_tables:
+                        for table_index, table in enumerate(page_tables):
+                            # Sauvegarder chaque tableau en fichier CSV
+                            table_filename = os.path.join(output_dir, f"table_page{page_num+1}_{table_index+1}.csv")
+                            with open(table_filename, "w", newline="") as f:
+                                writer = csv.writer(f)
+                                writer.writerows(table)
+                            count("tables_written")
+                            count("bytes_written", os.path.getsize(table_filename))
+                            table_files.append(table_filename)
+        except Exception as e:
+            logger.warning("Erreur avec pdfplumber pour l'extraction des tableaux de %s : %s", pdf_path, e)
+            count("table_errors")
+            tables_complete = False
+
+    return page_texts, images, table_files, math_formulas, image_manifest, tables_complete
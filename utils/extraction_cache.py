@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+from utils.disk_cache import evict, mark_used, staged
+
+# Cache disque des résultats d'extraction, adressé par le contenu du PDF.
+# Une entrée = un dossier <clé>/ contenant manifest.json et les fichiers
+# produits (images PNG, tableaux CSV) ; l'heure de modification du manifeste
+# sert d'horodatage LRU.
+CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "./.cache/extraction")
+MAX_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 500 * 1024 * 1024))  # 500 MB
+
+MANIFEST_NAME = "manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def pdf_hash(pdf_path) -> str:
+    # SHA-256 du fichier lu par blocs pour ne pas charger tout le PDF en mémoire
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Références indirectes d'un objet PDF (« 12 0 R »). Les liens vers le haut
+# de l'arbre (/Parent, /P : page ou nœud parent) ne sont pas suivis.
+OBJECT_REF = re.compile(rb"(\d+) (\d+) R")
+UPWARD_REF = re.compile(rb"/(?:Parent|P)\s+\d+ \d+ R")
+
+
+def page_fingerprint(doc, page, stream_digests=None) -> str:
+    # Empreinte d'une page : géométrie, flux de contenu et tout le graphe de
+    # ses ressources (polices et leurs fichiers, images, Form XObjects
+    # parcourus récursivement...). Deux pages qui appellent un formulaire du
+    # même nom (« /fzFrm0 Do ») mais de contenu différent ont des empreintes
+    # différentes. Les numéros d'objets sont remplacés par leur ordre de
+    # visite : une page inchangée d'une version à l'autre du PDF garde la
+    # même empreinte, même si le reste du fichier a changé.
+    # stream_digests : empreintes des flux déjà lus (partagé entre les pages
+    # d'un document, pour ne pas relire une police commune à chaque page)
+    if stream_digests is None:
+        stream_digests = {}
+    digest = hashlib.sha256()
+    digest.update(repr((tuple(page.rect), page.rotation)).encode("utf-8"))
+    digest.update(page.read_contents() or b"")
+
+    # Ressources de la page, éventuellement héritées d'un nœud parent
+    xref = page.xref
+    kind, value = doc.xref_get_key(xref, "Resources")
+    while kind == "null":
+        kind, parent = doc.xref_get_key(xref, "Parent")
+        if kind != "xref":
+            break
+        xref = int(parent.split()[0])
+        kind, value = doc.xref_get_key(xref, "Resources")
+
+    order = {}  # numéro d'objet -> ordre de découverte
+    queue = []
+
+    def ordinal(match):
+        ref = int(match.group(1))
+        if ref not in order:
+            order[ref] = len(order)
+            queue.append(ref)
+        return b"#%d" % order[ref]
+
+    digest.update(OBJECT_REF.sub(ordinal, value.encode("latin-1", "replace")))
+    position = 0
+    while position < len(queue):
+        xref = queue[position]
+        position += 1
+        source = UPWARD_REF.sub(b"", doc.xref_object(xref, compressed=True).encode("latin-1", "replace"))
+        digest.update(b"\0%d\0" % order[xref] + OBJECT_REF.sub(ordinal, source))
+        if doc.xref_is_stream(xref):
+            if xref not in stream_digests:
+                stream_digests[xref] = hashlib.sha256(doc.xref_stream_raw(xref) or b"").digest()
+            digest.update(stream_digests[xref])
+    return digest.hexdigest()
+
+
+def cache_key(digest: str, kind: str, **options) -> str:
+    # Les options d'extraction font partie de la clé : un même PDF extrait
+    # avec ou sans OCR donne deux entrées distinctes
+    payload = json.dumps({"pdf": digest, "kind": kind, "options": options}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_size=MAX_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key, track=True):
+        # track=False : consultation non comptée dans stats() (ex. texte de
+        # chaque page, cherché page par page)
+        manifest_path = os.path.join(self._entry_dir(key), MANIFEST_NAME)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            self._count(track, hit=False)
+            return None
+
+        # Restaure les fichiers produits à leur emplacement d'origine
+        # (l'interface les retrouve par leur chemin dans temp_files)
+        files_dir = os.path.join(self._entry_dir(key), "files")
+        try:
+            for original_path, stored_name in manifest["files"].items():
+                target_dir = os.path.dirname(original_path)
+                if target_dir:
+                    os.makedirs(target_dir, exist_ok=True)
+                shutil.copyfile(os.path.join(files_dir, stored_name), original_path)
+
+            mark_used(manifest_path)
+        except OSError:
+            # Entrée évincée entre-temps par une autre session
+            self._count(track, hit=False)
+            return None
+        self._count(track, hit=True)
+        return manifest["result"]
+
+    def _count(self, track, hit):
+        if not track:
+            return
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def put(self, key, result, files=()):
+        self._write_entry(key, result, files)
+        self._evict()
+
+    def _write_entry(self, key, result, files=()):
+        with staged(self.cache_dir, self._entry_dir(key)) as tmp_dir:
+            files_dir = os.path.join(tmp_dir, "files")
+            os.makedirs(files_dir)
+
+            stored = {}
+            for index, path in enumerate(files):
+                if not os.path.exists(path):
+                    continue
+                stored_name = f"{index}_{os.path.basename(path)}"
+                shutil.copyfile(path, os.path.join(files_dir, stored_name))
+                stored[path] = stored_name
+
+            manifest = {"result": result, "files": stored, "created_at": time.time()}
+            with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False)
+
+    def put_many(self, results):
+        # Plusieurs entrées sans fichiers (ex. texte de chaque page), avec une
+        # seule passe d'éviction
+        for key, result in results.items():
+            self._write_entry(key, result)
+        if results:
+            self._evict()
+
+    def _evict(self):
+        evict(self.cache_dir, self.max_size, stamp_name=MANIFEST_NAME)
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    # Instance partagée par toutes les sessions du processus
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ExtractionCache()
+        return _default_cache
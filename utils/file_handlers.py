@@ -3,18 +3,110 @@ from pathlib import Path
 import tempfile
 import os
 import shutil
+import threading
+import time
+import uuid
+
+# Dossier des fichiers de travail (images et tableaux extraits)
+TEMP_DIR = "./temp_files"
+# PDF téléversés : un sous-dossier unique par session, pour que deux
+# utilisateurs qui envoient un fichier du même nom ne s'écrasent pas
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(TEMP_DIR, "uploads"))
+# Taille maximale d'un PDF (à garder sous server.maxUploadSize de Streamlit, 200 Mo par défaut)
+MAX_FILE_SIZE = int(os.getenv("MAX_UPLOAD_BYTES", 200 * 1024 * 1024))  # 200 MB
+# Copie du fichier par blocs : pas de seconde copie complète en mémoire
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Durée de conservation des fichiers temporaires sans utilisation (secondes)
+TEMP_FILES_TTL = float(os.getenv("TEMP_FILES_TTL", 24 * 3600))
+# Intervalle minimal entre deux nettoyages (secondes)
+CLEANUP_INTERVAL = 3600
+
+_last_cleanup = 0.0
+_cleanup_lock = threading.Lock()
+
+
+def _session_upload_dir():
+    session_dir = st.session_state.get("upload_dir")
+    if session_dir is None or not os.path.isdir(session_dir):
+        os.makedirs(UPLOAD_DIR, exist_ok=True)
+        session_dir = tempfile.mkdtemp(prefix="session-", dir=UPLOAD_DIR)
+        st.session_state["upload_dir"] = session_dir
+    # Dossier marqué comme utilisé : il n'est pas nettoyé tant que la session vit
+    os.utime(session_dir, None)
+    return session_dir
+
+
+def save_upload(uploaded_file):
+    # Enregistre le PDF téléversé dans le dossier de la session et renvoie son
+    # chemin. Pas de réécriture aux reruns de suivi : un travail en cours lit
+    # peut-être ce fichier. Un nouveau téléversement (même nom, même taille
+    # compris) a un autre identifiant et reçoit un nouveau chemin.
+    # Dossier de la session marqué comme utilisé à chaque rerun, avant le
+    # nettoyage : le PDF n'est pas supprimé tant que la session le consulte
+    session_dir = _session_upload_dir()
+    cleanup_temp_files()
+    os.makedirs(TEMP_DIR, exist_ok=True)  # Images et tableaux extraits y sont écrits
+    uploads = st.session_state.setdefault("uploads", {})  # Identifiant du téléversement -> chemin
+    pdf_path = uploads.get(uploaded_file.file_id)
+    if pdf_path is not None and os.path.exists(pdf_path):
+        return pdf_path
+
+    pdf_path = os.path.join(session_dir, os.path.basename(uploaded_file.name))
+    if os.path.exists(pdf_path):
+        # Version précédente du même fichier : conservée pour les travaux qui la lisent
+        pdf_path = os.path.join(tempfile.mkdtemp(dir=session_dir), os.path.basename(uploaded_file.name))
+
+    # Écriture par blocs dans un fichier temporaire puis renommage atomique
+    tmp_path = f"{pdf_path}.{uuid.uuid4().hex}.part"
+    uploaded_file.seek(0)
+    try:
+        with open(tmp_path, "wb") as f:
+            shutil.copyfileobj(uploaded_file, f, UPLOAD_CHUNK_SIZE)
+        os.replace(tmp_path, pdf_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    uploads[uploaded_file.file_id] = pdf_path
+    return pdf_path
+
+
+def cleanup_temp_files(max_age=TEMP_FILES_TTL, force=False):
+    # Supprime les dossiers de session et les fichiers extraits inutilisés
+    # depuis max_age secondes (au plus une fois par CLEANUP_INTERVAL)
+    global _last_cleanup
+    with _cleanup_lock:
+        now = time.time()
+        if not force and now - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = now
+
+    for directory in (TEMP_DIR, UPLOAD_DIR):
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.abspath(path) == os.path.abspath(UPLOAD_DIR):
+                continue
+            try:
+                if now - os.path.getmtime(path) <= max_age:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+            except OSError:
+                pass
+
 
 def upload_local_pdf():
     uploaded_file = st.sidebar.file_uploader("📄 Importer un PDF local", type=["pdf"])
     if uploaded_file:
-        # On crée un chemin temporaire avec le nom original du fichier
-        temp_dir = tempfile.mkdtemp()
-        file_path = Path(temp_dir) / uploaded_file.name
-        
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.read())
-        
-        return file_path
+        if uploaded_file.size > MAX_FILE_SIZE:
+            st.sidebar.error(f"Le fichier est trop volumineux. La taille maximale est de {MAX_FILE_SIZE / (1024 * 1024):.0f} Mo.")
+            return None
+        return Path(save_upload(uploaded_file))
     return None
 
 # === Google Drive ===
@@ -0,0 +1,183 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Mesures par document : durée de chaque étape (rendu, OCR, fusion des
+# lignes, tableaux, appels au modèle...) et compteurs (pages, pages OCR,
+# octets écrits, tokens). Un rapport JSON est écrit dans le journal
+# « e_learning.metrics » à la fin de chaque document, et ajouté (une ligne
+# par document) au fichier METRICS_LOG_PATH (vide = pas de fichier).
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "./.cache/metrics.jsonl")
+
+logger = logging.getLogger("e_learning.metrics")
+logger.setLevel(logging.INFO)
+_log_handler_lock = threading.Lock()
+_log_handler_ready = False
+
+# Derniers rapports, pour le panneau de débogage de l'interface
+MAX_RECENT_REPORTS = 50
+_recent_reports = deque(maxlen=MAX_RECENT_REPORTS)
+_recent_reports_lock = threading.Lock()
+
+_current = contextvars.ContextVar("e_learning_metrics", default=None)
+
+
+class Metrics:
+    def __init__(self, kind, name=None):
+        self.kind = kind
+        self.name = name
+        self.started_at = time.time()
+        self.timings = {}  # étape -> secondes cumulées
+        self.counters = {}
+        self._lock = threading.Lock()  # Les appels au modèle peuvent arriver de plusieurs tâches
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, report):
+        # Fusionne les mesures faites ailleurs (processus d'extraction parallèle)
+        for stage, seconds in report.get("timings", {}).items():
+            self.add_time(stage, seconds)
+        for name, value in report.get("counters", {}).items():
+            self.count(name, value)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "document": self.name,
+                "started_at": self.started_at,
+                "total_seconds": time.time() - self.started_at,
+                "timings": {stage: round(seconds, 4) for stage, seconds in self.timings.items()},
+                "counters": dict(self.counters),
+            }
+
+
+def _get_logger():
+    # Fichier de mesures ouvert à la première écriture
+    global _log_handler_ready
+    with _log_handler_lock:
+        if not _log_handler_ready:
+            if METRICS_LOG_PATH:
+                log_dir = os.path.dirname(METRICS_LOG_PATH)
+                if log_dir:
+                    os.makedirs(log_dir, exist_ok=True)
+                handler = logging.FileHandler(METRICS_LOG_PATH, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+            _log_handler_ready = True
+    return logger
+
+
+def current_metrics():
+    return _current.get()
+
+
+@contextmanager
+def track_document(kind, name=None):
+    # Ouvre la mesure d'un document. Imbriqué dans une mesure déjà ouverte
+    # (ex. extraction appelée par un travail de structuration), réutilise
+    # celle-ci : un seul rapport par document.
+    metrics = _current.get()
+    if metrics is not None:
+        yield metrics
+        return
+
+    metrics = Metrics(kind, name)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+        _report(metrics)
+
+
+def track_iter(kind, name, iterator):
+    # Équivalent de track_document pour un générateur (ne pas utiliser
+    # track_document dans un générateur : la variable de contexte resterait
+    # positionnée chez l'appelant entre deux valeurs produites, et pour de bon
+    # s'il s'arrête en route). Ici, la mesure n'est active que pendant que
+    # `iterator` calcule ; le rapport est écrit quand il est épuisé ou refermé.
+    outer = _current.get()
+    metrics = outer if outer is not None else Metrics(kind, name)
+    try:
+        while True:
+            with use_metrics(metrics):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            with use_metrics(metrics):
+                close()
+        if outer is None:
+            _report(metrics)
+
+
+def _report(metrics):
+    report = metrics.as_dict()
+    with _recent_reports_lock:
+        _recent_reports.append(report)
+    _get_logger().info(json.dumps(report, ensure_ascii=False))
+
+
+@contextmanager
+def use_metrics(metrics):
+    # Rattache les mesures à un document ouvert dans un autre thread ou une
+    # autre tâche asyncio (les variables de contexte ne les suivent pas)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(stage):
+    # Chronomètre une étape ; sans mesure ouverte, ne fait rien
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_time(stage, time.perf_counter() - start)
+
+
+def count(name, value=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def recent_reports():
+    with _recent_reports_lock:
+        return list(_recent_reports)
+
+
+def render_debug_panel(limit=10):
+    # Panneau Streamlit optionnel : derniers rapports de mesure
+    import streamlit as st
+
+    reports = recent_reports()[-limit:]
+    with st.expander("🛠️ Mesures de performance", expanded=False):
+        if not reports:
+            st.caption("Aucune mesure pour l'instant.")
+        for report in reversed(reports):
+            st.markdown(f"**{report['kind']}** — {report['document']} — {report['total_seconds']:.2f} s")
+            st.json(report, expanded=False)
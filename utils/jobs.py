@@ -0,0 +1,329 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from utils.sqlite_utils import closing_transaction
+
+# File de travaux en arrière-plan : l'extraction et la structuration d'un PDF
+# tournent dans des threads de travail, hors du script Streamlit. Les travaux,
+# leur avancement et leurs résultats partiels sont stockés dans une base
+# SQLite locale, que l'interface interroge à chaque rerun.
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "./.cache/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Intervalle de scrutation de la base par les threads de travail (secondes)
+POLL_INTERVAL = 1.0
+# Intervalle de rafraîchissement de l'interface pendant un travail (secondes)
+UI_POLL_INTERVAL = 1.0
+# Bail d'un travail en cours (secondes) : le thread qui l'exécute le renouvelle
+# (updated_at) plusieurs fois par bail ; un travail dont le bail a expiré
+# (serveur arrêté, processus tué) est repris par le premier thread libre
+JOB_LEASE = float(os.getenv("JOB_LEASE", 300))
+# Durée de conservation des travaux terminés et de leurs résultats (secondes)
+JOBS_TTL = float(os.getenv("JOBS_TTL", 24 * 3600))
+# Intervalle minimal entre deux purges des travaux expirés (secondes)
+PRUNE_INTERVAL = 600
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    pdf_path TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 0,
+    stage TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+# Types de travaux : nom -> fonction(job, pdf_path, **options) renvoyant un
+# résultat sérialisable en JSON
+_handlers = {}
+
+
+def job_handler(kind):
+    def register(func):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+class Job:
+    # Contexte passé à une fonction de travail pour publier son avancement
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.id = job_id
+        self._seq = 0
+
+    def progress(self, done, total, stage=None):
+        self.queue._update(self.id, progress_done=done, progress_total=total, stage=stage)
+
+    def emit(self, item):
+        # Résultat partiel (une page, une section...) visible immédiatement par l'interface
+        with self.queue._connect() as conn:
+            conn.execute(
+                "INSERT INTO job_items (job_id, seq, item) VALUES (?, ?, ?)",
+                (self.id, self._seq, json.dumps(item, ensure_ascii=False)),
+            )
+        self._seq += 1
+
+
+class JobQueue:
+    def __init__(self, db_path=JOBS_DB_PATH, workers=JOB_WORKERS, lease=JOB_LEASE):
+        self.db_path = db_path
+        self.lease = lease
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")  # Lectures de l'interface sans bloquer les écritures
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+        self._wakeup = threading.Event()
+        self._last_prune = 0.0
+        self._prune_lock = threading.Lock()
+        self._threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _connect(self, write=True):
+        # Une connexion par opération : les connexions SQLite ne se partagent pas entre threads
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return closing_transaction(conn, write)
+
+    def submit(self, kind, pdf_path, **options):
+        if kind not in _handlers:
+            raise ValueError(f"Type de travail inconnu : {kind}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, pdf_path, options, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, str(pdf_path), json.dumps(options), QUEUED, now, now),
+            )
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        # État d'un travail, avec ses résultats partiels ; None si inconnu
+        with self._connect(write=False) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            items = conn.execute("SELECT item FROM job_items WHERE job_id = ? ORDER BY seq", (job_id,)).fetchall()
+        job = dict(row)
+        job["options"] = json.loads(job["options"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["items"] = [json.loads(item["item"]) for item in items]
+        return job
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _claim(self):
+        # Prend le plus ancien travail en attente, ou interrompu (bail expiré :
+        # les travaux encore exécutés par un autre processus qui partage la
+        # base ne sont pas repris) ; la transaction IMMEDIATE garantit qu'un
+        # seul thread (ou processus) l'obtient
+        with self._connect() as conn:
+            job = conn.execute(
+                "SELECT * FROM jobs WHERE status = ? OR (status = ? AND updated_at < ?) ORDER BY created_at LIMIT 1",
+                (QUEUED, RUNNING, time.time() - self.lease),
+            ).fetchone()
+            if job is None:
+                return None
+            conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (RUNNING, time.time(), job["id"]))
+            # Résultats partiels d'une exécution précédente interrompue
+            conn.execute("DELETE FROM job_items WHERE job_id = ?", (job["id"],))
+            return job
+
+    def _heartbeat(self, job_id, stop):
+        # Renouvelle le bail du travail tant que sa fonction s'exécute (une
+        # étape longue, ex. OCR d'une page ou réponse du modèle, ne publie
+        # pas d'avancement)
+        while not stop.wait(self.lease / 4):
+            try:
+                with self._connect() as conn:
+                    conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ?",
+                                 (time.time(), job_id, RUNNING))
+            except sqlite3.Error:
+                traceback.print_exc()
+
+    def prune(self, ttl=JOBS_TTL):
+        # Supprime les travaux terminés (réussis ou en échec) depuis plus de
+        # `ttl` secondes, avec leurs résultats partiels
+        expired = time.time() - ttl
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM job_items WHERE job_id IN "
+                "(SELECT id FROM jobs WHERE status IN (?, ?) AND updated_at < ?)",
+                (DONE, FAILED, expired),
+            )
+            conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, expired))
+
+    def _prune_if_due(self):
+        # Appelé par les threads de travail inoccupés ; une seule purge à la fois
+        with self._prune_lock:
+            if time.time() - self._last_prune < PRUNE_INTERVAL:
+                return
+            self._last_prune = time.time()
+        try:
+            self.prune()
+        except sqlite3.Error:
+            traceback.print_exc()
+
+    def _work(self):
+        while True:
+            row = self._claim()
+            if row is None:
+                self._prune_if_due()
+                self._wakeup.wait(POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+
+            job = Job(self, row["id"])
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(row["id"], stop),
+                                         name=f"{threading.current_thread().name}-heartbeat", daemon=True)
+            heartbeat.start()
+            try:
+                result = _handlers[row["kind"]](job, row["pdf_path"], **json.loads(row["options"]))
+                status = {"status": DONE, "result": json.dumps(result, ensure_ascii=False)}
+            except Exception as e:
+                traceback.print_exc()
+                status = {"status": FAILED, "error": str(e)}
+            finally:
+                stop.set()
+                heartbeat.join()
+            self._update(row["id"], **status)
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    # File partagée par toutes les sessions du processus (les threads de
+    # travail survivent aux reruns du script)
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
+
+
+# === Types de travaux ===
+
+@job_handler("pages")
+def _pages_job(job, pdf_path, **options):
+    # Extraction du texte page par page (app.py)
+    from utils.pdf_preprocessing import extract_text_from_pdf, get_page_count
+
+    page_count = get_page_count(pdf_path)
+    job.progress(0, page_count, "extraction")
+    for i, page in enumerate(extract_text_from_pdf(pdf_path, stream=True, **options)):
+        job.emit(page)
+        job.progress(i + 1, page_count, "extraction")
+    return None
+
+
+def _extract_pages(pdf_path, with_tables, output_dir):
+    # Texte de chaque page et manifeste des images du document
+    from utils.document_parser import extract_text_images, extract_text_images_tables
+
+    if with_tables:
+        page_texts, _, _, _, image_manifest = extract_text_images_tables(pdf_path, output_dir=output_dir)
+        return page_texts, image_manifest
+    page_texts, _, image_manifest = extract_text_images(pdf_path, output_dir=output_dir)
+    return page_texts, image_manifest
+
+
+@job_handler("structure")
+def _structure_job(job, pdf_path, prompt="structure", with_tables=True, incremental=False, use_store=True):
+    # Extraction puis structuration par le modèle (app_new.py, app_all.py, application.py).
+    # L'index de recherche des pages (questions sur le cours) est construit au
+    # passage ; le résultat donne sa clé (« index_key »).
+    from utils.content_store import content_variant, get_content_store, is_complete
+    from utils.document_parser import OUTPUT_DIR, PARSER_VERSION, element_paths
+    from utils.extraction_cache import pdf_hash
+    from utils.instrumentation import track_document
+    from utils.retrieval import get_embedder, get_retrieval_store, pdf_index_key
+    from utils.structuring import STRUCTURE_PROMPT, stream_educational_content, stream_structure
+
+    digest = pdf_hash(pdf_path)
+    variant = content_variant(prompt, with_tables)
+    retrieval = get_retrieval_store()
+    index_key = pdf_index_key(digest, get_embedder(), parser_version=PARSER_VERSION)
+    # Un dossier par document : deux travaux simultanés n'écrivent pas les
+    # mêmes noms de fichiers (image_page1_1.png, table_page1_1.csv...)
+    output_dir = os.path.join(OUTPUT_DIR, digest)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Cours déjà traité : restitué depuis la base de contenu
+    if use_store:
+        stored = get_content_store().get_document(digest, variant)
+        if stored is not None and is_complete(stored["sections"]):
+            if retrieval.find_index(index_key) is None:
+                # Index évincé, ou cours importé par ingest.py (extraction servie par son cache)
+                job.progress(0, 0, "extraction")
+                retrieval.get_index(_extract_pages(pdf_path, with_tables, output_dir)[0], key=index_key)
+            return {**stored, "index_key": index_key}
+
+    # Un seul rapport de mesures pour l'extraction et la structuration du document
+    with track_document(f"structure_job:{prompt}", os.path.basename(pdf_path)):
+        job.progress(0, 0, "extraction")
+        page_texts, image_manifest = _extract_pages(pdf_path, with_tables, output_dir)
+        index = retrieval.get_index(page_texts, key=index_key)
+
+        job.progress(0, 0, "structuration")
+        # Contenu pédagogique : plan, puis exercices générés section par section
+        if prompt == "educational":
+            section_iter = stream_educational_content(page_texts, incremental=incremental, index=index)
+        else:
+            section_iter = stream_structure(page_texts, STRUCTURE_PROMPT, incremental=incremental)
+        sections = []
+        for section in section_iter:
+            sections.append(section)
+            # Chaque section est publiée avec les fichiers de ses éléments
+            # (dossier du document, doublons d'images résolus par le manifeste)
+            job.emit({"section": section, "element_paths": element_paths([section], image_manifest, output_dir)})
+            job.progress(len(sections), 0, "structuration")
+
+    paths = element_paths(sections, image_manifest, output_dir)
+    if use_store and is_complete(sections):
+        # Les chemins renvoyés pointent vers les copies conservées par la base
+        store = get_content_store()
+        store.save_document(digest, variant, sections, image_manifest,
+                            name=os.path.basename(pdf_path), element_paths=paths)
+        return {**store.get_document(digest, variant), "index_key": index_key}
+    return {"sections": sections, "image_manifest": image_manifest, "element_paths": paths, "index_key": index_key}
@@ -0,0 +1,76 @@
+class JSONArrayStreamParser:
+    # Analyse incrémentale d'un tableau JSON reçu par morceaux : le texte brut
+    # de chaque objet de premier niveau est renvoyé dès que son accolade
+    # fermante arrive (validation et réparation à la charge de l'appelant).
+    # Le tableau est le premier « [ » suivi (aux espaces près) d'un « { » ou
+    # d'un « ] » : le texte qui le précède (balises de code Markdown, phrase
+    # d'introduction, même avec des crochets...) est ignoré.
+
+    def __init__(self):
+        self._started = False  # « [ » de premier niveau rencontré
+        self._opening = False  # « [ » vu, premier caractère significatif pas encore lu
+        self._finished = False  # « ] » de premier niveau rencontré
+        self._depth = 0  # Profondeur d'imbrication à l'intérieur du tableau
+        self._in_string = False
+        self._escape = False
+        self._current = []  # Morceaux de l'objet en cours
+        self._current_start = 0  # Début de l'objet en cours dans le morceau reçu
+
+    def feed_raw(self, text):
+        # Renvoie le texte brut des éléments terminés dans ce morceau
+        elements = []
+        self._current_start = 0 if self._depth > 0 else None
+
+        for i, char in enumerate(text):
+            if self._finished:
+                break
+            if not self._started:
+                if self._opening and not char.isspace():
+                    # « [{ » ou « [] » : début du tableau ; sinon (« [Introduction, ...] »), texte ignoré
+                    self._opening = False
+                    self._started = char in "{]"
+                if not self._started:
+                    self._opening = self._opening or char == "["
+                    continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0:
+                    self._current_start = i
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Fin du tableau de premier niveau
+                    self._finished = True
+                    continue
+                self._depth -= 1
+                if self._depth == 0:
+                    self._current.append(text[self._current_start:i + 1])
+                    elements.append("".join(self._current))
+                    self._current = []
+                    self._current_start = None
+
+        # Objet encore ouvert : on garde la fin du morceau pour le prochain appel
+        if self._depth > 0 and self._current_start is not None:
+            self._current.append(text[self._current_start:])
+
+        return elements
+
+    @property
+    def started(self):
+        return self._started
+
+    @property
+    def pending(self):
+        # Élément commencé mais jamais terminé (réponse tronquée)
+        return "".join(self._current) if self._depth > 0 else ""
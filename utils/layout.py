@@ -0,0 +1,62 @@
+import numpy as np
+
+# Reconstitution de l'ordre de lecture d'une page à partir des rectangles des
+# blocs de texte (page.get_text("blocks")) : les blocs qui occupent presque
+# toute la largeur du texte (titres, notes de bas de page) découpent la page
+# en bandes horizontales ; dans chaque bande, les blocs dont les intervalles
+# horizontaux se chevauchent forment une colonne, lue de haut en bas, et les
+# colonnes sont lues de gauche à droite.
+
+# Part de la largeur du texte au-delà de laquelle un bloc traverse les colonnes
+SPANNING_BLOCK_RATIO = 0.6
+# Chevauchement horizontal (pt) toléré entre deux colonnes distinctes
+COLUMN_OVERLAP_TOLERANCE = 2.0
+
+
+def _column_ids(x0, x1):
+    # Regroupe des intervalles [x0, x1] en colonnes : un intervalle qui
+    # commence après la fin de tous les précédents (triés par x0) ouvre une
+    # nouvelle colonne. Renvoie l'indice de colonne de chaque intervalle.
+    order = np.argsort(x0, kind="stable")
+    sorted_x0 = x0[order]
+    reach = np.maximum.accumulate(x1[order])
+    starts = np.empty(len(order), dtype=bool)
+    starts[0] = False
+    starts[1:] = sorted_x0[1:] >= reach[:-1] - COLUMN_OVERLAP_TOLERANCE
+    ids = np.empty(len(order), dtype=np.int64)
+    ids[order] = np.cumsum(starts)
+    return ids
+
+
+def reading_order(rects):
+    # rects : tableau (n, 4) de x0, y0, x1, y1. Renvoie les indices des blocs
+    # dans l'ordre de lecture.
+    rects = np.asarray(rects, dtype=np.float64).reshape(-1, 4)
+    if len(rects) <= 1:
+        return np.arange(len(rects))
+    x0, y0, x1, y1 = rects.T
+
+    text_width = max(x1.max() - x0.min(), 1.0)
+    spanning = (x1 - x0) >= SPANNING_BLOCK_RATIO * text_width
+
+    # Bande de chaque bloc : nombre de blocs traversants qui commencent au-dessus
+    # (un bloc traversant ouvre sa propre bande)
+    band_tops = np.sort(y0[spanning])
+    band = np.searchsorted(band_tops, y0, side="right")
+
+    column = np.full(len(rects), -1, dtype=np.int64)  # Blocs traversants : en tête de leur bande
+    for band_index in np.unique(band[~spanning]):
+        members = np.flatnonzero((band == band_index) & ~spanning)
+        column[members] = _column_ids(x0[members], x1[members])
+
+    # Tri par bande, puis colonne, puis position verticale
+    return np.lexsort((x0, y0, column, band))
+
+
+def page_text_in_reading_order(page):
+    # Texte de la page, blocs concaténés dans l'ordre de lecture
+    blocks = [block for block in page.get_text("blocks") if block[6] == 0 and block[4].strip()]
+    if not blocks:
+        return ""
+    order = reading_order([block[:4] for block in blocks])
+    return "".join(blocks[index][4].rstrip("\n") + "\n" for index in order)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils.disk_cache import evict, mark_used, staged
+
+# Cache disque des réponses du modèle : une entrée = un fichier <clé>.json.
+# L'heure de modification du fichier sert d'horodatage LRU.
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", "./.cache/llm")
+MAX_CACHE_SIZE = int(os.getenv("LLM_CACHE_MAX_BYTES", 100 * 1024 * 1024))  # 100 MB
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))  # 7 jours
+
+
+def normalize_prompt(text: str) -> str:
+    # Les différences d'espaces ou de retours à la ligne ne changent pas la requête
+    return " ".join(text.split())
+
+
+def response_key(prompt: str, **params) -> str:
+    # params : version du gabarit de prompt, modèle, paramètres de génération...
+    payload = json.dumps({"prompt": normalize_prompt(prompt), "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_size=MAX_CACHE_SIZE, ttl=CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if time.time() - entry["created_at"] > self.ttl:
+                # Entrée expirée
+                os.remove(path)
+                raise FileNotFoundError(path)
+            mark_used(path)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.saved_tokens += entry.get("tokens", 0)
+        return entry["response"]
+
+    def put(self, key, response, tokens=0):
+        # tokens : tokens facturés par la requête (prompt + réponse), comptés
+        # comme économisés à chaque réutilisation
+        with staged(self.cache_dir, self._entry_path(key)) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"response": response, "tokens": tokens, "created_at": time.time()}, f,
+                          ensure_ascii=False)
+        evict(self.cache_dir, self.max_size, max_age=self.ttl)
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_tokens": self.saved_tokens,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    # Instance partagée par toutes les sessions du processus
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
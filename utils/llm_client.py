@@ -0,0 +1,201 @@
+import asyncio
+import concurrent.futures
+import os
+import queue
+import random
+import threading
+
+from azure.ai.inference.aio import ChatCompletionsClient
+from azure.core.credentials import AzureKeyCredential
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+from utils.instrumentation import count, current_metrics, timed, use_metrics
+
+# Configuration du client Azure pour GPT-4
+endpoint = "https://models.github.ai/inference"
+model = "openai/gpt-4.1"
+token = os.getenv("GITHUB_TOKEN")  # Il faut assurer que le github token est dans les variables d'environnement
+
+# Nombre maximal de requêtes simultanées vers le modèle, pour tout le processus
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+# Délai maximal d'une requête (secondes)
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 180))
+# Nouvelles tentatives sur limitation de débit (429), erreurs serveur (5xx) et coupures réseau
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_BACKOFF_BASE = 1.0  # secondes
+LLM_BACKOFF_MAX = 60.0  # secondes
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Boucle asyncio dédiée, partagée par toutes les sessions Streamlit : le
+# client (et son pool de connexions HTTP) et le sémaphore y vivent, et les
+# appels synchrones du script y sont soumis
+_loop = None
+_loop_lock = threading.Lock()
+_client = None
+_semaphore = None
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client", daemon=True).start()
+        return _loop
+
+
+def _get_client():
+    # Appelé uniquement depuis la boucle dédiée
+    global _client, _semaphore
+    if _client is None:
+        _client = ChatCompletionsClient(
+            endpoint=endpoint,
+            credential=AzureKeyCredential(token),
+            retry_total=0,  # Les nouvelles tentatives sont gérées ici, avec le sémaphore
+        )
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _client
+
+
+def _retry_delay(error, attempt):
+    # Respecte l'en-tête Retry-After du service quand il est présent,
+    # sinon attente exponentielle avec gigue
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), LLM_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return min(LLM_BACKOFF_BASE * 2 ** attempt, LLM_BACKOFF_MAX) * random.uniform(0.5, 1.0)
+
+
+def _is_retryable(error):
+    if isinstance(error, HttpResponseError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (ServiceRequestError, ServiceResponseError, asyncio.TimeoutError))
+
+
+def _count_usage(usage):
+    # Tokens facturés, tels que rapportés par le service
+    if usage is not None:
+        count("prompt_tokens", usage.prompt_tokens or 0)
+        count("completion_tokens", usage.completion_tokens or 0)
+
+
+async def _with_metrics(metrics, coro):
+    # Les tâches de la boucle dédiée ne voient pas les variables de contexte
+    # du thread appelant : les mesures du document en cours y sont rattachées
+    with use_metrics(metrics):
+        return await coro
+
+
+async def complete_async(messages, **params):
+    # Renvoie le texte de la réponse du modèle pour une conversation
+    client = _get_client()
+    params.setdefault("model", model)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            async with _semaphore:
+                with timed("llm_request"):
+                    response = await asyncio.wait_for(client.complete(messages=messages, **params),
+                                                      LLM_REQUEST_TIMEOUT)
+            count("llm_requests")
+            _count_usage(response.usage)
+            return response.choices[0].message.content
+        except Exception as e:
+            if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                raise
+            count("llm_retries")
+            # L'attente se fait hors du sémaphore pour laisser passer les autres requêtes
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+
+async def stream_async(messages, **params):
+    # Produit le texte de la réponse au fur et à mesure de sa génération.
+    # Les nouvelles tentatives ne sont possibles qu'avant le premier morceau
+    # reçu ; ensuite, une erreur interrompt le flux.
+    client = _get_client()
+    params.setdefault("model", model)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await _semaphore.acquire()
+        try:
+            response = await asyncio.wait_for(client.complete(messages=messages, stream=True, **params),
+                                              LLM_REQUEST_TIMEOUT)
+            break
+        except Exception as e:
+            _semaphore.release()
+            if attempt == LLM_MAX_RETRIES or not _is_retryable(e):
+                raise
+            count("llm_retries")
+            # L'attente se fait hors du sémaphore pour laisser passer les autres requêtes
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+    # Le sémaphore reste pris pendant toute la durée du flux
+    count("llm_requests")
+    updates = response.__aiter__()
+    try:
+        with timed("llm_request"):
+            while True:
+                try:
+                    # Délai maximal sans nouveau morceau
+                    update = await asyncio.wait_for(updates.__anext__(), LLM_REQUEST_TIMEOUT)
+                except StopAsyncIteration:
+                    break
+                # Le dernier morceau porte l'usage quand le service le fournit
+                _count_usage(getattr(update, "usage", None))
+                if update.choices and update.choices[0].delta.content:
+                    yield update.choices[0].delta.content
+    finally:
+        _semaphore.release()
+        await response.close()
+
+
+def complete_each(conversations, **params):
+    # Envoie plusieurs conversations en parallèle (dans la limite de
+    # LLM_MAX_CONCURRENCY) et produit (indice, réponse, erreur) dans l'ordre
+    # d'achèvement : une requête en échec n'interrompt pas les autres
+    metrics = current_metrics()
+    futures = {
+        asyncio.run_coroutine_threadsafe(_with_metrics(metrics, complete_async(messages, **params)), _get_loop()): index
+        for index, messages in enumerate(conversations)
+    }
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+    finally:
+        # Le consommateur a arrêté la lecture : les requêtes restantes sont annulées
+        for future in futures:
+            future.cancel()
+
+
+def stream(messages, **params):
+    # Version synchrone de stream_async : les morceaux produits sur la boucle
+    # dédiée sont transmis au script par une file
+    pieces = queue.Queue()
+
+    async def pump():
+        try:
+            async for piece in stream_async(messages, **params):
+                pieces.put(("data", piece))
+            pieces.put(("end", None))
+        except Exception as e:
+            pieces.put(("error", e))
+
+    future = asyncio.run_coroutine_threadsafe(_with_metrics(current_metrics(), pump()), _get_loop())
+    try:
+        while True:
+            kind, value = pieces.get()
+            if kind == "data":
+                yield value
+            elif kind == "end":
+                return
+            else:
+                raise value
+    finally:
+        # Le consommateur a arrêté la lecture (ou le flux est terminé)
+        future.cancel()
@@ -1,75 +1,482 @@
+import cv2
 import fitz  # PyMuPDF
-from paddleocr import PaddleOCR
+import numpy as np
+import math
+import multiprocessing
 import os
 import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 
-ocr_engine = PaddleOCR(use_angle_cls=True, lang='fr')  # Initialise l’OCR Paddle en français
+from utils.extraction_cache import cache_key, get_extraction_cache, page_fingerprint, pdf_hash
+from utils.instrumentation import Metrics, count, current_metrics, timed, track_iter, use_metrics
+from utils.layout import page_text_in_reading_order
 
-def merge_lines(text: str) -> str:
-    lines = text.split('\n')
-    merged = []
-    buffer = ""
+# Langue par défaut de l'OCR Paddle (français)
+OCR_LANG = os.getenv("OCR_LANG", "fr")
+
+# Nombre de processus pour l'extraction parallèle (1 = extraction séquentielle)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", 1))
+# Nombre de tranches de pages par processus : des tranches plus petites
+# répartissent mieux les pages coûteuses (OCR) entre les processus
+SHARDS_PER_WORKER = 4
+# Nombre de pages scannées traitées ensemble par l'OCR
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", 8))
+# Score minimal de reconnaissance pour garder une ligne OCR (même seuil que PaddleOCR)
+OCR_DROP_SCORE = 0.5
+
+# Version de l'algorithme d'extraction, incluse dans la clé du cache pour ne
+# pas resservir des résultats produits par une version précédente
+EXTRACTION_VERSION = 5
+
+# Déclenchement de l'OCR selon la qualité de la couche texte de la page
+MIN_CHAR_DENSITY = 0.5  # Caractères visibles par 1000 pt² en dessous desquels une page scannée est passée à l'OCR
+MIN_IMAGE_COVERAGE = 0.5  # Part de la page couverte par des images pour la considérer comme scannée
+MIN_PRINTABLE_RATIO = 0.9  # Part minimale de caractères imprimables dans une couche texte correcte
+MIN_WORD_RATIO = 0.5  # Part minimale de mots « plausibles » dans une couche texte correcte
+# Résolution de rendu pour l'OCR, adaptée à la résolution native des images scannées
+OCR_MIN_DPI = 150
+OCR_MAX_DPI = 300
+OCR_DEFAULT_DPI = 200
+
+# Ligne qui prolonge la précédente (commence par une minuscule)
+LOWERCASE_START = re.compile(r"[a-zéèàçâêîôûëïü]")
+
+# Jetons de formule (« f(x)=x²+2x+1 », « a_n=1/n », « x∈ℝ ») : ni mots ni
+# charabia, ils restent neutres dans le jugement de la couche texte
+FORMULA_CHARS = frozenset("=+*/^_<>≤≥≠≈±×÷∈∉⊂∪∩∀∃∫∑∏√∂∞→⇒⇔°²³¹⁰ⁿ₀₁₂")
+
+WORD_PATTERN = re.compile(r"^[\w'’.,;:!?()«»\"-]*[^\W\d_]{2,}[\w'’.,;:!?()«»\"-]*$|^[\d.,:%/()-]+$")
+
+# Moteurs PaddleOCR déjà chargés dans ce processus, par jeu d'options
+_ocr_engines = {}
+_ocr_engines_lock = threading.Lock()
+
+def get_ocr_engine(lang=OCR_LANG, use_angle_cls=True):
+    # Chargement paresseux : le modèle n'est construit qu'à la première page
+    # qui a réellement besoin de l'OCR, puis partagé par toutes les sessions
+    # du processus (les reruns Streamlit ne réimportent pas le module)
+    key = (lang, use_angle_cls)
+    engine = _ocr_engines.get(key)
+    if engine is None:
+        with _ocr_engines_lock:
+            engine = _ocr_engines.get(key)
+            if engine is None:
+                from paddleocr import PaddleOCR  # Import coûteux (charge paddle)
+                engine = PaddleOCR(use_angle_cls=use_angle_cls, lang=lang)
+                _ocr_engines[key] = engine
+    return engine
+
+# Pool de processus unique, conservé entre deux extractions : chaque processus
+# garde ainsi son moteur OCR déjà chargé d'un document à l'autre. Il est
+# dimensionné au plus grand nombre de processus demandé ; chaque extraction
+# limite elle-même le nombre de tranches en cours à son propre `workers`.
+_process_pool = None
+_process_pool_size = 0
+_process_pool_lock = threading.Lock()
+
+def _get_process_pool(workers):
+    global _process_pool, _process_pool_size
+    with _process_pool_lock:
+        if _process_pool is None or workers > _process_pool_size:
+            if _process_pool is not None:
+                # Les tranches déjà soumises à l'ancien pool s'y terminent
+                _process_pool.shutdown(wait=False)
+            # « spawn » : le processus parent a déjà des threads (Streamlit,
+            # client du modèle, travaux en arrière-plan), qu'un fork pourrait
+            # figer en copiant un verrou tenu par l'un d'eux
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _process_pool_size = workers
+        return _process_pool
+
+def _discard_process_pool(pool):
+    # Pool inutilisable (un processus de travail est mort, ex. tué faute de
+    # mémoire pendant l'OCR) : le prochain appel à _get_process_pool en crée
+    # un nouveau. Sans effet si une autre extraction l'a déjà remplacé.
+    global _process_pool, _process_pool_size
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+            _process_pool_size = 0
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _submit_to_pool(workers, fn, *args):
+    # Renvoie (pool, future) : le pool sert à l'écarter si la tranche échoue
+    while True:
+        pool = _get_process_pool(workers)
+        try:
+            return pool, pool.submit(fn, *args)
+        except BrokenProcessPool:
+            _discard_process_pool(pool)
+        except RuntimeError:
+            # Pool remplacé entre-temps par un plus grand : nouvel essai sur celui-ci
+            if pool is _process_pool:
+                raise
+
+def pixmap_to_array(pix):
+    # Vue NumPy sur le tampon du pixmap (hauteur x largeur x canaux), sans
+    # passer par un PNG intermédiaire
+    samples = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    # PaddleOCR attend des images BGR (convention OpenCV) : seule copie, en mémoire
+    return np.ascontiguousarray(samples[:, :, ::-1])
+
+def _sort_boxes(boxes):
+    # Ordre de lecture : de haut en bas, puis de gauche à droite pour les
+    # boîtes situées sur une même ligne (tolérance de 10 px)
+    boxes = sorted(boxes, key=lambda box: (box[0][1], box[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+def _crop_box(image, box):
+    # Redresse la zone de texte détectée (quadrilatère) en une image rectangulaire
+    points = np.array(box, dtype=np.float32)
+    width = max(1, int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3]))))
+    height = max(1, int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2]))))
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    # Texte vertical : on le couche pour la reconnaissance
+    if height / width >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+def _recognition_lines(recognition):
+    # Résultats de reconnaissance à plat, une paire (texte, score) par ligne :
+    # PaddleOCR 2.6 renvoie directement la liste des paires, 2.7+ une liste
+    # de paires par image passée
+    lines = []
+    for result in recognition or []:
+        if isinstance(result, (tuple, list)) and len(result) == 2 and isinstance(result[0], str):
+            lines.append(tuple(result))
+        else:
+            lines.extend(tuple(line) for line in result or [])
+    return lines
+
+def ocr_images(images, lang=OCR_LANG):
+    # OCR d'un lot de pages : la détection se fait page par page, puis toutes
+    # les lignes détectées du lot passent ensemble dans la classification
+    # d'orientation et la reconnaissance, par mini-lots internes à PaddleOCR
+    ocr_engine = get_ocr_engine(lang)
+    crops = []
+    owners = []  # Indice de la page d'origine de chaque ligne
+    for index, image in enumerate(images):
+        detection = ocr_engine.ocr(image, det=True, rec=False, cls=False)
+        boxes = detection[0] if detection and detection[0] else []
+        for box in _sort_boxes(boxes):
+            crops.append(_crop_box(image, box))
+            owners.append(index)
+
+    page_lines = [[] for _ in images]
+    if crops:
+        # Toutes les lignes forment une seule « image » multiple : PaddleOCR
+        # les reconnaît par mini-lots et renvoie un résultat par ligne
+        recognition = _recognition_lines(ocr_engine.ocr([crops], det=False, rec=True, cls=True))
+        if len(recognition) != len(owners):
+            raise RuntimeError(f"OCR : {len(recognition)} lignes reconnues pour {len(owners)} lignes détectées")
+        for owner, (line_text, score) in zip(owners, recognition):
+            if score >= OCR_DROP_SCORE:
+                page_lines[owner].append(line_text)
+
+    return ["".join(line + "\n" for line in lines) for lines in page_lines]
+
+def score_page_text(page, text):
+    # Indicateurs bon marché de la qualité de la couche texte d'une page
+    page_area = max(page.rect.width * page.rect.height, 1.0)
+    visible_chars = [c for c in text if not c.isspace()]
+    printable = sum(1 for c in visible_chars if c.isprintable() and c != "\ufffd")
+    # Seuls les jetons alphabétiques d'au moins deux caractères sont jugés :
+    # variables, opérateurs, ponctuation isolés et jetons de formule restent neutres
+    tokens = [token for token in text.split()
+              if len(token) > 1 and any(c.isalpha() for c in token) and FORMULA_CHARS.isdisjoint(token)]
+    words = sum(1 for token in tokens if WORD_PATTERN.match(token))
+
+    # Surface couverte par les images et résolution native de la plus grande
+    image_area = 0.0
+    largest_image = None
+    for img in page.get_images(full=True):
+        xref, width_px = img[0], img[2]
+        for rect in page.get_image_rects(xref):
+            area = (rect & page.rect).get_area()
+            image_area += area
+            if largest_image is None or area > largest_image[0]:
+                largest_image = (area, width_px, rect.width)
+
+    native_dpi = None
+    if largest_image and largest_image[2] > 0:
+        native_dpi = largest_image[1] / (largest_image[2] / 72)
+
+    return {
+        "char_density": len(visible_chars) * 1000 / page_area,
+        "printable_ratio": printable / len(visible_chars) if visible_chars else 0.0,
+        "word_ratio": words / len(tokens) if tokens else 1.0,
+        "image_coverage": min(image_area / page_area, 1.0),
+        "native_dpi": native_dpi,
+    }
+
+def ocr_dpi_for_page(page, text):
+    # Renvoie la résolution à utiliser pour l'OCR de la page, ou None si la
+    # couche texte est jugée exploitable
+    score = score_page_text(page, text)
+
+    if score["char_density"] == 0:
+        needs_ocr = True
+    elif score["image_coverage"] >= MIN_IMAGE_COVERAGE and score["char_density"] < MIN_CHAR_DENSITY:
+        # Page scannée avec seulement un filigrane ou un numéro de page en texte
+        needs_ocr = True
+    else:
+        # Couche texte illisible (mauvais encodage de police, caractères de remplacement...)
+        needs_ocr = score["printable_ratio"] < MIN_PRINTABLE_RATIO or score["word_ratio"] < MIN_WORD_RATIO
 
-    for i, line in enumerate(lines):
+    if not needs_ocr:
+        return None
+
+    # Rendre à la résolution native du scan suffit : au-delà, on ne fait
+    # qu'agrandir des pixels existants
+    if score["native_dpi"]:
+        return int(min(max(score["native_dpi"], OCR_MIN_DPI), OCR_MAX_DPI))
+    return OCR_DEFAULT_DPI
+
+def iter_paragraphs(lines):
+    # Regroupe les lignes en paragraphes : une ligne qui commence par une
+    # minuscule prolonge la précédente. Chaque paragraphe est assemblé en une
+    # seule fois à partir de ses morceaux (coût linéaire en la longueur du texte).
+    pieces = []
+    for line in lines:
         line = line.strip()
         if not line:
             continue
 
-        # Fusionner si la ligne suivante ne commence pas par majuscule
-        if buffer:
-            if re.match(r'^[a-zéèàçâêîôûëïü]', line):  # ligne suivante minuscule
-                buffer += ' ' + line
+        if pieces and LOWERCASE_START.match(line):
+            previous = pieces[-1]
+            # Mot coupé en fin de ligne (« automa-» / « tique ») : on recolle sans le tiret
+            if len(previous) > 1 and previous[-1] == "-" and previous[-2].isalpha():
+                pieces[-1] = previous[:-1]
             else:
-                merged.append(buffer)
-                buffer = line
+                pieces.append(" ")
+            pieces.append(line)
         else:
-            buffer = line
+            if pieces:
+                yield "".join(pieces)
+            pieces = [line]
+
+    if pieces:
+        yield "".join(pieces)
+
+def merge_lines(text: str) -> str:
+    return "\n\n".join(iter_paragraphs(text.split("\n")))
+
+def get_page_count(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+def page_fingerprints(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        stream_digests = {}
+        return [page_fingerprint(doc, page, stream_digests) for page in doc]
+
+def extract_text_from_pdf(pdf_path, ocr_if_needed=True, detect_columns=True, use_cache=True, workers=None,
+                          ocr_batch_size=OCR_BATCH_SIZE, ocr_lang=OCR_LANG, stream=False, incremental=True):
+    # En mode flux (stream=True), renvoie un générateur qui produit le texte
+    # de chaque page, dans l'ordre, dès qu'il est prêt.
+    # En mode incrémental (avec le cache), les pages dont l'empreinte a déjà
+    # été vue (ex. version précédente du même cours) ne sont pas ré-extraites.
+    pages = iter_text_from_pdf(pdf_path, ocr_if_needed, detect_columns, use_cache, workers, ocr_batch_size, ocr_lang,
+                               incremental)
+    return pages if stream else list(pages)
+
+def iter_text_from_pdf(pdf_path, ocr_if_needed=True, detect_columns=True, use_cache=True, workers=None,
+                       ocr_batch_size=OCR_BATCH_SIZE, ocr_lang=OCR_LANG, incremental=True):
+    return track_iter("pages", os.path.basename(str(pdf_path)),
+                      _iter_text_from_pdf(pdf_path, ocr_if_needed, detect_columns, use_cache, workers, ocr_batch_size,
+                                          ocr_lang, incremental))
+
+def _iter_text_from_pdf(pdf_path, ocr_if_needed, detect_columns, use_cache, workers, ocr_batch_size, ocr_lang,
+                        incremental):
+    options = {"ocr_if_needed": ocr_if_needed, "detect_columns": detect_columns, "ocr_lang": ocr_lang,
+               "version": EXTRACTION_VERSION}
+
+    # Un PDF déjà traité avec les mêmes options est restitué depuis le cache
+    # sans ré-analyse ni OCR
+    if use_cache:
+        cache = get_extraction_cache()
+        with timed("cache_lookup"):
+            key = cache_key(pdf_hash(pdf_path), "pages", **options)
+            pages = cache.get(key)
+        if pages is not None:
+            count("cache_hits")
+            count("pages", len(pages))
+            yield from pages
+            return
+
+    # Sinon, les pages déjà extraites (même empreinte de page) sont reprises
+    known = {}
+    page_keys = None
+    if use_cache and incremental:
+        with timed("fingerprints"):
+            page_keys = [cache_key(fingerprint, "page", **options) for fingerprint in page_fingerprints(pdf_path)]
+            for page_num, page_key in enumerate(page_keys):
+                text = cache.get(page_key, track=False)
+                if text is not None:
+                    known[page_num] = text
+        count("reused_pages", len(known))
+        page_count = len(page_keys)
+    else:
+        page_count = get_page_count(pdf_path)
+    page_numbers = [page_num for page_num in range(page_count) if page_num not in known]
+
+    if workers is None:
+        workers = EXTRACTION_WORKERS
+
+    if workers > 1:
+        page_iter = _iter_pages_parallel(pdf_path, page_numbers, ocr_if_needed, detect_columns, workers,
+                                         ocr_batch_size, ocr_lang)
+    else:
+        page_iter = _iter_pages(pdf_path, page_numbers, ocr_if_needed, detect_columns, ocr_batch_size, ocr_lang)
 
-    if buffer:
-        merged.append(buffer)
+    pages = []
+    for page_num in range(page_count):
+        text = known[page_num] if page_num in known else next(page_iter)
+        pages.append(text)
+        yield text
 
-    return '\n\n'.join(merged)
+    # N'est atteint que si le document a été parcouru en entier
+    if use_cache:
+        with timed("cache_store"):
+            # Pages nouvellement extraites et document entier : une seule passe d'éviction
+            entries = {page_keys[page_num]: pages[page_num] for page_num in page_numbers} if page_keys else {}
+            cache.put_many({**entries, key: pages})
 
-def extract_text_from_pdf(pdf_path, ocr_if_needed=True, detect_columns=True):
-    all_pages_text = []
+def _iter_pages_parallel(pdf_path, page_numbers, ocr_if_needed, detect_columns, workers, ocr_batch_size, ocr_lang):
+    # Découpe les pages à extraire en tranches contiguës ; chaque processus
+    # ouvre sa propre copie du document (un objet fitz ne se partage pas)
+    shard_size = max(1, math.ceil(len(page_numbers) / (workers * SHARDS_PER_WORKER)))
+    shards = [page_numbers[start:start + shard_size] for start in range(0, len(page_numbers), shard_size)]
+    if len(shards) <= 1:
+        yield from _iter_pages(pdf_path, page_numbers, ocr_if_needed, detect_columns, ocr_batch_size, ocr_lang)
+        return
 
+    # Au plus `workers` tranches en cours : le pool est partagé avec les
+    # autres extractions. Les tranches sont rendues dans l'ordre de
+    # soumission (ordre des pages), chacune dès qu'elle est terminée.
+    def submit(shard):
+        return (shard, *_submit_to_pool(workers, _extract_pages, pdf_path, shard, ocr_if_needed, detect_columns,
+                                        ocr_batch_size, ocr_lang))
+
+    remaining = iter(shards)
+    running = deque(submit(shard) for shard in islice(remaining, workers))
+    metrics = current_metrics()
+    restarted = False
+    try:
+        while running:
+            shard, pool, future = running[0]
+            try:
+                pages, shard_metrics = future.result()
+            except BrokenProcessPool:
+                # Processus de travail mort : les tranches en cours sont
+                # relancées une fois sur un nouveau pool ; au second échec, la
+                # suite du document est extraite dans ce processus
+                _discard_process_pool(pool)
+                retry = [shard for shard, _, _ in running]
+                running.clear()
+                count("broken_pools")
+                if restarted:
+                    rest = [page_num for shard in retry + list(remaining) for page_num in shard]
+                    yield from _iter_pages(pdf_path, rest, ocr_if_needed, detect_columns, ocr_batch_size, ocr_lang)
+                    return
+                restarted = True
+                running.extend(submit(shard) for shard in retry)
+                continue
+
+            running.popleft()
+            next_shard = next(remaining, None)
+            if next_shard is not None:
+                running.append(submit(next_shard))
+            # Mesures faites dans le processus de travail
+            if metrics is not None:
+                metrics.merge(shard_metrics)
+            yield from pages
+    finally:
+        # Lecture interrompue : les tranches pas encore commencées sont abandonnées
+        for _, _, future in running:
+            future.cancel()
+
+def _extract_pages(pdf_path, page_numbers, ocr_if_needed, detect_columns, ocr_batch_size=OCR_BATCH_SIZE,
+                   ocr_lang=OCR_LANG):
+    # Exécuté dans un processus de travail : les mesures de la tranche sont
+    # renvoyées avec les pages pour être fusionnées dans celles du document
+    with use_metrics(Metrics("pages")) as metrics:
+        pages = list(_iter_pages(pdf_path, page_numbers, ocr_if_needed, detect_columns, ocr_batch_size, ocr_lang))
+    return pages, metrics.as_dict()
+
+def _iter_pages(pdf_path, page_numbers, ocr_if_needed, detect_columns, ocr_batch_size=OCR_BATCH_SIZE,
+                ocr_lang=OCR_LANG):
+    # page_numbers : pages à extraire, dans l'ordre (None = toutes)
     # Ouvre le document avec PyMuPDF
-    doc = fitz.open(pdf_path)
-
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        text = page.get_text("text") if detect_columns else page.get_text("plain")
-
-        # Si le texte extrait est vide ou trop fragmenté, utiliser l'OCR
-        if not text.strip() and ocr_if_needed:
-            # Convertir la page en image
-            pix = page.get_pixmap(dpi=300)
-            image_path = f"temp_page_{page_num + 1}.png"
-            pix.save(image_path)
-
-            # Utiliser PaddleOCR pour extraire du texte de l'image
-            result = ocr_engine.ocr(image_path, cls=True)
-            ocr_text = ""
-            
-            # Vérification si 'result' est valide avant d'itérer
-            if result:
-                for line in result:
-                    if line:  # Vérifier que la ligne n'est pas None
-                        for box in line:
-                            if box:  # Vérifier que le box n'est pas None
-                                ocr_text += box[1][0] + "\n"
-            else:
-                print(f"Aucune donnée OCR extraite pour la page {page_num + 1}.")
-            
-            text = ocr_text
+    with fitz.open(pdf_path) as doc:
+        if page_numbers is None:
+            page_numbers = range(len(doc))
 
-            # Nettoyage : supprime le fichier image temporaire
-            if os.path.exists(image_path):
-                os.remove(image_path)
+        # Pages lues mais pas encore produites : (numéro, texte, résolution OCR ou None).
+        # Une page ne sort qu'une fois les pages scannées qui la précèdent passées
+        # à l'OCR, par lots de ocr_batch_size
+        pending = []
+        pending_ocr = 0
 
-        # Nettoyage et fusion des lignes
-        text = merge_lines(text.strip())
-        all_pages_text.append(text)
+        for page_num in page_numbers:
+            page = doc.load_page(page_num)
+            with timed("text_layer"):
+                # Pages en colonnes : blocs remis dans l'ordre de lecture
+                text = page_text_in_reading_order(page) if detect_columns else page.get_text("text")
+            count("pages")
 
-    return all_pages_text
+            # Si le texte extrait est vide, trop pauvre ou illisible, la page passera par l'OCR
+            with timed("scoring"):
+                dpi = ocr_dpi_for_page(page, text) if ocr_if_needed else None
+            pending.append((page_num, text, dpi))
+            if dpi:
+                pending_ocr += 1
 
+            if not pending_ocr or pending_ocr >= ocr_batch_size:
+                yield from _flush_pages(doc, pending, ocr_lang)
+                pending = []
+                pending_ocr = 0
+
+        yield from _flush_pages(doc, pending, ocr_lang)
+
+def _flush_pages(doc, pending, ocr_lang):
+    # OCR par lots : les pages ne sont rendues qu'au moment de traiter leur
+    # lot, pour ne garder en mémoire que OCR_BATCH_SIZE images
+    ocr_batch = [(page_num, dpi) for page_num, _, dpi in pending if dpi]
+    ocr_texts = {}
+    if ocr_batch:
+        images = []
+        with timed("render"):
+            for page_num, dpi in ocr_batch:
+                # Convertir la page en image (RVB sans canal alpha)
+                pix = doc.load_page(page_num).get_pixmap(dpi=dpi, alpha=False)
+                images.append(pixmap_to_array(pix))
+                pix = None
+
+        with timed("ocr"):
+            ocr_results = ocr_images(images, ocr_lang)
+        count("ocr_pages", len(ocr_batch))
+
+        for (page_num, _), ocr_text in zip(ocr_batch, ocr_results):
+            if not ocr_text:
+                print(f"Aucune donnée OCR extraite pour la page {page_num + 1}.")
+            ocr_texts[page_num] = ocr_text
+
+    for page_num, text, _ in pending:
+        text = ocr_texts.get(page_num, text)
+        # Nettoyage et fusion des lignes
+        with timed("merge_lines"):
+            merged = merge_lines(text.strip())
+        yield merged
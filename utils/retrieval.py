@@ -0,0 +1,326 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.disk_cache import evict, mark_used, staged
+from utils.instrumentation import count, timed
+
+# Index de recherche sémantique local sur le texte des pages d'un cours :
+# les pages sont découpées en passages, chaque passage est représenté par un
+# vecteur (fonction d'embedding locale, interchangeable) et les vecteurs sont
+# stockés dans une matrice NumPy sur disque, ouverte en mémoire partagée
+# (memmap). Seuls les passages les plus proches d'une requête sont ensuite
+# envoyés au modèle, au lieu du cours entier.
+#
+# Une entrée = un dossier <clé>/ contenant vectors.npy, chunks.json et, pour
+# les gros index, la partition IVF (centroids.npy, lists.npy, offsets.npy).
+RETRIEVAL_DIR = os.getenv("RETRIEVAL_DIR", "./.cache/retrieval")
+MAX_INDEX_SIZE = int(os.getenv("RETRIEVAL_MAX_BYTES", 500 * 1024 * 1024))  # 500 MB
+# Fonction d'embedding : « hashing » (locale, sans modèle) ou
+# « sentence-transformers:<modèle> »
+RETRIEVAL_EMBEDDER = os.getenv("RETRIEVAL_EMBEDDER", "hashing")
+
+# Passages : fenêtres de mots, chevauchantes, sans franchir les pages
+CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", 200))
+CHUNK_OVERLAP = 40
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 6))
+EMBED_BATCH_SIZE = 256
+
+# Au-delà de IVF_MIN_CHUNKS passages, la recherche exhaustive est remplacée
+# par une recherche IVF : les vecteurs sont répartis entre ~√n centroïdes et
+# seules les IVF_NPROBE listes les plus proches de la requête sont parcourues
+IVF_MIN_CHUNKS = int(os.getenv("RETRIEVAL_IVF_MIN_CHUNKS", 20000))
+IVF_NPROBE = int(os.getenv("RETRIEVAL_IVF_NPROBE", 8))
+IVF_TRAIN_ITERATIONS = 10
+
+# Version du découpage et du format, incluse dans la clé de l'index
+INDEX_VERSION = 1
+HASHING_DIM = 1024
+
+WORD_PATTERN = re.compile(r"\w+")
+CHUNKS_NAME = "chunks.json"
+
+
+def _normalize_words(text):
+    # Minuscules, sans accents : « Dérivée » et « derivee » se rejoignent
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return WORD_PATTERN.findall(text)
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class HashingEmbedder:
+    # Embedding sans modèle ni réseau : sac de mots et de bigrammes projeté
+    # par hachage signé sur `dim` composantes. Déterministe, ce qui en fait
+    # aussi l'embedding des essais hors ligne.
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        words = _normalize_words(text)
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                vectors[row, value % self.dim] += 1.0 if value >> 63 else -1.0
+        # Atténue le poids des termes répétés
+        np.copysign(np.log1p(np.abs(vectors)), vectors, out=vectors)
+        return _normalize_rows(vectors)
+
+
+class SentenceTransformerEmbedder:
+    # Modèle d'embedding local (paquet sentence-transformers, optionnel)
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers:{model_name}"
+
+    def embed(self, texts):
+        vectors = self._model.encode(list(texts), batch_size=EMBED_BATCH_SIZE, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    # Fonction d'embedding partagée par toutes les sessions du processus
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            if RETRIEVAL_EMBEDDER.startswith("sentence-transformers:"):
+                _embedder = SentenceTransformerEmbedder(RETRIEVAL_EMBEDDER.split(":", 1)[1])
+            else:
+                _embedder = HashingEmbedder()
+        return _embedder
+
+
+def set_embedder(embedder):
+    # Remplace la fonction d'embedding : tout objet ayant `name`, `dim` et
+    # `embed(texts) -> tableau (n, dim)` de vecteurs normés
+    global _embedder
+    with _embedder_lock:
+        _embedder = embedder
+
+
+def split_pages(pages, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    # Renvoie les passages sous forme de (numéro de page, texte)
+    step = max(chunk_words - overlap, 1)
+    chunks = []
+    for page_num, text in enumerate(pages):
+        words = text.split()
+        for start in range(0, max(len(words) - overlap, 1), step):
+            piece = " ".join(words[start:start + chunk_words])
+            if piece:
+                chunks.append((page_num, piece))
+    return chunks
+
+
+def index_key(pages, embedder, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    # Adressé par le texte des pages : un PDF ré-extrait à l'identique
+    # retrouve son index
+    digest = hashlib.sha256()
+    for text in pages:
+        digest.update(hashlib.sha256(text.encode("utf-8")).digest())
+    payload = json.dumps({"pages": digest.hexdigest(), "embedder": embedder.name, "chunk_words": chunk_words,
+                          "overlap": overlap, "version": INDEX_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def pdf_index_key(digest, embedder, **source):
+    # Index désigné par l'empreinte du PDF (et la version de l'extraction,
+    # dans `source`) : l'interface le retrouve sans ré-extraire le texte
+    payload = json.dumps({"pdf": digest, "source": source, "embedder": embedder.name, "chunk_words": CHUNK_WORDS,
+                          "overlap": CHUNK_OVERLAP, "version": INDEX_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _train_ivf(vectors, nlist, seed=0):
+    # k-moyennes sphériques (produit scalaire sur des vecteurs normés),
+    # calculées par blocs pour ne pas charger toute la matrice en mémoire
+    rng = np.random.default_rng(seed)
+    centroids = np.array(vectors[np.sort(rng.choice(len(vectors), nlist, replace=False))], dtype=np.float32)
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for _ in range(IVF_TRAIN_ITERATIONS):
+        sums = np.zeros_like(centroids)
+        for start in range(0, len(vectors), EMBED_BATCH_SIZE * 32):
+            block = np.asarray(vectors[start:start + EMBED_BATCH_SIZE * 32])
+            block_assignments = np.argmax(block @ centroids.T, axis=1)
+            assignments[start:start + len(block)] = block_assignments
+            np.add.at(sums, block_assignments, block)
+        # Un centroïde resté vide garde sa position
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]
+        centroids = _normalize_rows(sums)
+
+    # Listes inversées : indices des passages triés par centroïde
+    lists = np.argsort(assignments, kind="stable")
+    offsets = np.searchsorted(assignments[lists], np.arange(nlist + 1))
+    return centroids, lists, offsets
+
+
+class RetrievalIndex:
+    def __init__(self, entry_dir, embedder):
+        self.embedder = embedder
+        self.vectors = np.load(os.path.join(entry_dir, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(entry_dir, CHUNKS_NAME), "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        self.pages = [page_num for page_num, _ in chunks]
+        self.texts = [text for _, text in chunks]
+        self.centroids = self.lists = self.offsets = None
+        if os.path.exists(os.path.join(entry_dir, "centroids.npy")):
+            self.centroids = np.load(os.path.join(entry_dir, "centroids.npy"))
+            self.lists = np.load(os.path.join(entry_dir, "lists.npy"), mmap_mode="r")
+            self.offsets = np.load(os.path.join(entry_dir, "offsets.npy"))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _candidates(self, query_vector, nprobe):
+        # Passages des listes IVF les plus proches de la requête
+        probes = np.argsort(self.centroids @ query_vector)[::-1][:nprobe]
+        return np.sort(np.concatenate([self.lists[self.offsets[c]:self.offsets[c + 1]] for c in probes]))
+
+    def search(self, query, k=RETRIEVAL_TOP_K, nprobe=IVF_NPROBE):
+        # Renvoie les k passages les plus proches, du plus pertinent au moins pertinent
+        if not self.texts or not query.strip():
+            return []
+        with timed("retrieval_search"):
+            query_vector = self.embedder.embed([query])[0]
+            if self.centroids is not None:
+                candidates = self._candidates(query_vector, nprobe)
+                scores = np.asarray(self.vectors[candidates]) @ query_vector
+            else:
+                candidates = np.arange(len(self.texts))
+                scores = np.asarray(self.vectors) @ query_vector
+            k = min(k, len(candidates))
+            if not k:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind="stable")]
+        return [{"chunk": int(candidates[i]), "page": self.pages[candidates[i]], "text": self.texts[candidates[i]],
+                 "score": float(scores[i])} for i in best]
+
+    def context(self, query, k=RETRIEVAL_TOP_K, label_pages=True):
+        # Texte à envoyer au modèle : les passages retenus, dans l'ordre du cours
+        hits = sorted(self.search(query, k), key=lambda hit: hit["chunk"])
+        if not label_pages:
+            return "\n\n".join(hit["text"] for hit in hits)
+        return "\n\n".join(f"[Page {hit['page'] + 1}]\n{hit['text']}" for hit in hits)
+
+
+class RetrievalStore:
+    def __init__(self, index_dir=RETRIEVAL_DIR, max_size=MAX_INDEX_SIZE, max_open=8):
+        self.index_dir = index_dir
+        self.max_size = max_size
+        self.max_open = max_open
+        # Index ouverts récemment (les matrices restent projetées en mémoire)
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.index_dir, key)
+
+    def get_index(self, pages, embedder=None, key=None):
+        # Index des pages d'un cours, construit au premier appel puis relu du
+        # disque ; `key` (ex. pdf_index_key) remplace la clé tirée du texte
+        embedder = embedder or get_embedder()
+        key = key or index_key(pages, embedder)
+        index = self._opened(key)
+        if index is not None:
+            return index
+
+        entry_dir = self._entry_dir(key)
+        if not os.path.exists(os.path.join(entry_dir, CHUNKS_NAME)):
+            self._build(entry_dir, pages, embedder)
+            evict(self.index_dir, self.max_size, stamp_name=CHUNKS_NAME, keep={entry_dir})
+        else:
+            mark_used(os.path.join(entry_dir, CHUNKS_NAME))
+        return self._remember(key, RetrievalIndex(entry_dir, embedder))
+
+    def find_index(self, key, embedder=None):
+        # Index déjà construit sous cette clé, sans les pages ; None s'il
+        # n'existe pas (jamais construit, ou évincé)
+        embedder = embedder or get_embedder()
+        index = self._opened(key)
+        if index is not None:
+            return index
+        entry_dir = self._entry_dir(key)
+        try:
+            mark_used(os.path.join(entry_dir, CHUNKS_NAME))
+            index = RetrievalIndex(entry_dir, embedder)
+        except OSError:
+            return None
+        return self._remember(key, index)
+
+    def _opened(self, key):
+        with self._lock:
+            if key in self._open:
+                self._open.move_to_end(key)
+                return self._open[key]
+        return None
+
+    def _remember(self, key, index):
+        with self._lock:
+            self._open[key] = index
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return index
+
+    def _build(self, entry_dir, pages, embedder):
+        with staged(self.index_dir, entry_dir) as tmp_dir, timed("retrieval_index"):
+            os.makedirs(tmp_dir)
+            chunks = split_pages(pages)
+            count("retrieval_chunks", len(chunks))
+
+            # Les vecteurs sont écrits par lots directement dans le fichier
+            vectors = np.lib.format.open_memmap(os.path.join(tmp_dir, "vectors.npy"), mode="w+",
+                                                dtype=np.float32, shape=(len(chunks), embedder.dim))
+            with timed("embedding"):
+                for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+                    batch = [text for _, text in chunks[start:start + EMBED_BATCH_SIZE]]
+                    vectors[start:start + len(batch)] = embedder.embed(batch)
+            vectors.flush()
+
+            if len(chunks) >= IVF_MIN_CHUNKS:
+                centroids, lists, offsets = _train_ivf(vectors, int(np.sqrt(len(chunks))))
+                np.save(os.path.join(tmp_dir, "centroids.npy"), centroids)
+                np.save(os.path.join(tmp_dir, "lists.npy"), lists)
+                np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+            del vectors
+
+            with open(os.path.join(tmp_dir, CHUNKS_NAME), "w", encoding="utf-8") as f:
+                json.dump(chunks, f, ensure_ascii=False)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_retrieval_store() -> RetrievalStore:
+    # Instance partagée par toutes les sessions du processus
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = RetrievalStore()
+        return _default_store
@@ -0,0 +1,136 @@
+import ast
+import json
+
+from utils.json_stream import JSONArrayStreamParser
+
+# Schéma d'une section produite par le modèle, tel que l'interface l'affiche :
+#   section, summary : texte non vide
+#   related_elements : liste de noms de fichiers
+#   qcm : [{question, choices (au moins 2), answer (l'un des choix)}]
+#   glossary : [{term, definition}]
+#   flashcards : [{front, back}]
+# Une réponse est découpée élément par élément : les sections valides sont
+# conservées telles quelles, les autres sont renvoyées avec leurs erreurs
+# pour une demande de réparation ciblée.
+SECTION_FIELDS = ("section", "summary", "related_elements", "qcm", "glossary", "flashcards")
+ACTIVITY_FIELDS = ("qcm", "glossary", "flashcards")
+ITEM_KEYS = {
+    "qcm": ("question", "answer"),
+    "glossary": ("term", "definition"),
+    "flashcards": ("front", "back"),
+}
+
+
+def strip_code_fences(text):
+    # Retire les éventuelles balises de code Markdown autour du JSON
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return text
+
+
+def _is_text(value):
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _item_errors(field, item):
+    if not isinstance(item, dict):
+        return ["n'est pas un objet"]
+    errors = [f"« {key} » manquant ou vide" for key in ITEM_KEYS[field] if not _is_text(item.get(key))]
+    if field == "qcm":
+        choices = item.get("choices")
+        if not isinstance(choices, list) or len(choices) < 2 or not all(_is_text(choice) for choice in choices):
+            errors.append("« choices » doit contenir au moins deux choix")
+        elif _is_text(item.get("answer")) and item["answer"].strip().lower() not in {
+                choice.strip().lower() for choice in choices}:
+            errors.append("« answer » doit reprendre l'un des choix")
+    return errors
+
+
+def _activity_errors(obj, required):
+    errors = []
+    for field in ACTIVITY_FIELDS:
+        if field not in obj:
+            if required:
+                errors.append(f"« {field} » manquant")
+            continue
+        if not isinstance(obj[field], list):
+            errors.append(f"« {field} » doit être une liste")
+            continue
+        for index, item in enumerate(obj[field]):
+            errors += [f"{field}[{index}] : {error}" for error in _item_errors(field, item)]
+    return errors
+
+
+def validate_activities(obj):
+    # QCM, glossaire et flashcards d'une section (les trois listes sont
+    # attendues). Renvoie (activités, erreurs) ; activités vaut None si invalide.
+    if not isinstance(obj, dict):
+        return None, ["la réponse n'est pas un objet JSON"]
+    errors = _activity_errors(obj, required=True)
+    if errors:
+        return None, errors
+    return {field: obj[field] for field in ACTIVITY_FIELDS}, []
+
+
+def validate_section(obj, require_activities=False):
+    # Renvoie (section normalisée, erreurs) ; la section vaut None si invalide
+    if not isinstance(obj, dict):
+        return None, ["la section n'est pas un objet JSON"]
+    errors = [f"« {field} » manquant ou vide" for field in ("section", "summary") if not _is_text(obj.get(field))]
+    related = obj.get("related_elements", [])
+    if not isinstance(related, list) or not all(isinstance(name, str) for name in related):
+        errors.append("« related_elements » doit être une liste de noms de fichiers")
+    errors += _activity_errors(obj, require_activities)
+    if errors:
+        return None, errors
+
+    section = {field: obj[field] for field in SECTION_FIELDS if field in obj}
+    section.setdefault("related_elements", [])
+    return section, []
+
+
+def decode_object(raw):
+    # JSON, ou à défaut littéral Python (guillemets simples, True/None...)
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return ast.literal_eval(raw.strip())
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def check_section(raw, require_activities=False):
+    # Un élément brut du tableau : renvoie (section ou None, brut, erreurs)
+    obj = decode_object(raw)
+    if obj is None:
+        return None, raw, ["JSON mal formé"]
+    section, errors = validate_section(obj, require_activities)
+    return section, raw, errors
+
+
+def parse_sections(text, require_activities=False):
+    # Découpe une réponse complète en éléments, dans l'ordre :
+    # liste de (section ou None, brut, erreurs). Une réponse non vide dont
+    # rien n'est tiré donne un élément en erreur, pour qu'elle soit réparée.
+    text = strip_code_fences(text).strip()
+    if not text:
+        return []
+
+    if not text.startswith("{"):
+        parser = JSONArrayStreamParser()
+        pieces = [check_section(raw, require_activities) for raw in parser.feed_raw(text)]
+        if parser.pending.strip():
+            pieces.append((None, parser.pending, ["objet JSON tronqué"]))
+        if parser.started:
+            return pieces or [(None, text, ["aucune section dans le tableau JSON"])]
+
+    # Pas de tableau de sections : la réponse entière est un objet (une seule section) ou un texte à réparer
+    obj = decode_object(text)
+    if obj is None:
+        return [(None, text, ["pas de tableau JSON de sections"])]
+    section, errors = validate_section(obj, require_activities)
+    return [(section, text, errors)]
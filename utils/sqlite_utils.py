@@ -0,0 +1,17 @@
+class closing_transaction:
+    # Connexion SQLite utilisée comme contexte : transaction validée ou
+    # annulée, puis fermée. Les lectures (write=False) ne prennent pas le
+    # verrou d'écriture.
+    def __init__(self, conn, write=True):
+        self.conn = conn
+        self.write = write
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE" if self.write else "BEGIN")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
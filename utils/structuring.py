@@ -0,0 +1,630 @@
+import hashlib
+import json
+import os
+import re
+
+import tiktoken
+from azure.ai.inference.models import SystemMessage, UserMessage
+
+from utils.instrumentation import count, timed, track_document, track_iter
+from utils.llm_cache import get_response_cache, normalize_prompt, response_key
+from utils.json_stream import JSONArrayStreamParser
+from utils.llm_client import complete_each, model, stream
+from utils.retrieval import RETRIEVAL_TOP_K, get_retrieval_store
+from utils.section_schema import ACTIVITY_FIELDS, check_section, parse_sections, strip_code_fences, validate_activities
+
+# Budget de tokens du contenu envoyé dans une requête : au-delà, le cours est
+# découpé en morceaux structurés séparément puis fusionnés
+MAX_CHUNK_TOKENS = int(os.getenv("STRUCTURE_MAX_CHUNK_TOKENS", 8000))
+# Mode incrémental : morceaux plus petits, aux frontières fixées par le
+# contenu, pour qu'une modification locale du cours ne change qu'un morceau
+INCREMENTAL_CHUNK_TOKENS = int(os.getenv("STRUCTURE_INCREMENTAL_CHUNK_TOKENS", 2000))
+# Un bloc sur BOUNDARY_MODULUS (selon son empreinte) peut clore un morceau ;
+# dans un texte sans titres, une ligne sur LINE_BOUNDARY_MODULUS
+BOUNDARY_MODULUS = 4
+LINE_BOUNDARY_MODULUS = 32
+
+# Paramètres de génération communs à toutes les requêtes de structuration
+GENERATION_PARAMS = {
+    "temperature": 0.3,  # Contrôle de la créativité du modèle
+    "top_p": 1.0,  # Contrôle de la diversité
+}
+
+# Version des gabarits de prompt, incluse dans la clé du cache des réponses :
+# à incrémenter quand une consigne change sans que le texte envoyé ne change
+PROMPT_VERSION = 1
+
+SYSTEM_PROMPT = "Tu es un expert en pédagogie et structure de contenu éducatif."
+
+# Consigne de découpage d'un document complet
+FULL_DOCUMENT_SCOPE = "Découpe ce document en : Introduction, Notion 1, Notion 2, ..., Conclusion."
+
+# Prompt de structuration simple (sections, résumés, éléments liés)
+STRUCTURE_PROMPT = """
+    Tu es un assistant pédagogique intelligent. Voici le contenu d'un cours en PDF :
+
+    {content}
+
+    {scope}
+    Pour chaque section :
+    - Donne un titre
+    - Résume en 3-5 lignes
+    - Identifie si des images, tableaux ou équations y sont liées
+    - Structure bien la réponse en JSON comme suit :
+    [
+      {{
+        "section": "Introduction",
+        "summary": "...",
+        "related_elements": ["image_page1_1.png", "eq_1.png"]
+      }},
+      {{
+        "section": "Notion 1",
+        "summary": "...",
+        "related_elements": ["image_page2_1.png", "table_page1_1.csv"]
+      }},
+      {{
+        "section": "Conclusion",
+        "summary": "...",
+        "related_elements": []
+      }}
+    ]
+    """
+
+# Contenu pédagogique en deux étapes : un plan rapide (STRUCTURE_PROMPT),
+# puis une requête par section, en parallèle, pour ses QCM, son glossaire et
+# ses flashcards, avec les passages du cours les plus proches de la section
+SECTION_ACTIVITIES_PROMPT = """
+    Tu es un assistant pédagogique intelligent. Voici une section d'un cours en PDF :
+
+    Titre : {section}
+    Résumé : {summary}
+
+    Extraits du cours liés à cette section :
+    {context}
+
+    Génère des QCM (QCU si applicable), un glossaire et des flashcards pour cette section.
+    Structure bien la réponse en JSON comme suit :
+    {{
+      "qcm": [{{"question": "...", "choices": ["A", "B", "C"], "answer": "A"}}],
+      "glossary": [{{"term": "mot", "definition": "..."}}],
+      "flashcards": [{{"front": "...", "back": "..."}}]
+    }}
+    """
+# Tentatives par section quand la réponse n'est pas exploitable
+SECTION_MAX_ATTEMPTS = int(os.getenv("SECTION_MAX_ATTEMPTS", 3))
+
+# Réparation ciblée : seuls les éléments invalides d'une réponse (JSON mal
+# formé, champ manquant, QCM incomplet, objet tronqué...) sont renvoyés au
+# modèle avec leurs erreurs et le morceau du cours dont ils sont tirés, au
+# lieu de régénérer tout le cours ; sans ce texte, le modèle inventerait le
+# contenu des sections tronquées
+REPAIR_PROMPT = """
+    Voici un extrait d'un cours en PDF :
+
+    {content}
+
+    Un extrait de la réponse JSON produite pour structurer ce cours est invalide :
+
+    {raw}
+
+    Erreurs relevées : {errors}
+
+    Corrige-le en t'appuyant uniquement sur le cours ci-dessus, et complète-le
+    s'il est tronqué ; n'invente aucune section absente du cours. Renvoie
+    uniquement un tableau JSON de sections au format suivant, ou [] si
+    l'extrait ne correspond à aucune partie du cours :
+    [{format}]
+    """
+SECTION_FORMAT = '{"section": "...", "summary": "...", "related_elements": []}'
+EDUCATIONAL_SECTION_FORMAT = (
+    '{"section": "...", "summary": "...", "related_elements": [], '
+    '"qcm": [{"question": "...", "choices": ["A", "B", "C"], "answer": "A"}], '
+    '"glossary": [{"term": "mot", "definition": "..."}], "flashcards": [{"front": "...", "back": "..."}]}'
+)
+REPAIR_MAX_ATTEMPTS = int(os.getenv("REPAIR_MAX_ATTEMPTS", 2))
+
+# Question d'un étudiant : seuls les passages du cours les plus proches de
+# la question (index de recherche local) sont envoyés au modèle
+QUESTION_PROMPT = """
+    Tu es un assistant pédagogique. Voici des extraits d'un cours en PDF :
+
+    {context}
+
+    Réponds à la question suivante en t'appuyant uniquement sur ces extraits,
+    en citant les pages utilisées. Si les extraits ne permettent pas de
+    répondre, dis-le.
+
+    Question : {question}
+    """
+
+# Début de titre (« Chapitre 2 », « II. », « 3.1 Dérivées »...) : frontière de découpage privilégiée
+HEADING_PATTERN = re.compile(r"^\s*(?:(?:chapitre|partie|section)\b|[IVX]+[.)]\s|\d+(?:\.\d+)*[.)]?\s+\S)", re.IGNORECASE)
+MAX_HEADING_LENGTH = 80
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.encoding_for_model(model.split("/")[-1])
+        except KeyError:
+            _encoding = tiktoken.get_encoding("o200k_base")  # Encodage des modèles GPT-4o / GPT-4.1
+    return _encoding
+
+
+def count_tokens(text):
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
+
+def _split_units(content):
+    # Découpe le texte en blocs commençant chacun par un titre
+    units = []
+    current = []
+    for line in content.split("\n"):
+        if current and len(line.strip()) <= MAX_HEADING_LENGTH and HEADING_PATTERN.match(line):
+            units.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        units.append("\n".join(current))
+    return units
+
+
+def _split_oversized(unit, max_tokens):
+    # Un bloc trop long est coupé sur les lignes, puis, en dernier recours,
+    # directement sur les tokens
+    encoding = _get_encoding()
+    pieces = []
+    current = []
+    current_tokens = 0
+    for line in unit.split("\n"):
+        line_tokens = count_tokens(line) + 1
+        if line_tokens > max_tokens:
+            if current:
+                pieces.append("\n".join(current))
+                current, current_tokens = [], 0
+            tokens = encoding.encode(line, disallowed_special=())
+            for start in range(0, len(tokens), max_tokens):
+                pieces.append(encoding.decode(tokens[start:start + max_tokens]))
+            continue
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def split_into_chunks(content, max_tokens=MAX_CHUNK_TOKENS):
+    # content : texte complet, ou liste de pages (les pages sont alors les
+    # frontières de découpage). Les blocs sont regroupés dans l'ordre tant que
+    # le morceau reste sous le budget de tokens.
+    units = content if isinstance(content, list) else _split_units(content)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = count_tokens(unit) + 1
+        pieces = [(unit, unit_tokens)]
+        if unit_tokens > max_tokens:
+            pieces = [(piece, count_tokens(piece) + 1) for piece in _split_oversized(unit, max_tokens)]
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _is_boundary(unit, modulus=BOUNDARY_MODULUS):
+    digest = hashlib.sha256(normalize_prompt(unit).encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % modulus == 0
+
+
+def _stable_lines(content):
+    # Lignes du cours, chacune avec un indicateur « fin d'un bloc frontière ».
+    # Une liste de pages est découpée page par page (un bloc ne déborde pas
+    # sur la page suivante).
+    pages = content if isinstance(content, list) else [content]
+    for page in pages:
+        for unit in _split_units(page):
+            lines = unit.split("\n")
+            for index, line in enumerate(lines):
+                yield line, index == len(lines) - 1 and _is_boundary(unit)
+
+
+def split_into_stable_chunks(content, max_tokens=INCREMENTAL_CHUNK_TOKENS):
+    # Découpage défini par le contenu : un morceau se ferme, dès qu'il
+    # atteint le quart du budget, après un bloc « frontière » ou une ligne
+    # « frontière » (selon leur empreinte), sinon avant de dépasser le budget.
+    # Une frontière ne dépend que du texte qui la précède : modifier un
+    # passage ne déplace que les frontières voisines, et les autres morceaux
+    # restent identiques d'une version à l'autre du cours (leurs réponses
+    # sont reprises du cache), y compris dans un long texte sans titres.
+    min_tokens = max_tokens // 4
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line, closes_unit in _stable_lines(content):
+        line_tokens = count_tokens(line) + 1
+        pieces = [(line, line_tokens)]
+        if line_tokens > max_tokens:
+            pieces = [(piece, count_tokens(piece) + 1) for piece in _split_oversized(line, max_tokens)]
+        for piece, piece_tokens in pieces:
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+        if current_tokens >= min_tokens and (
+                closes_unit or (line.strip() and _is_boundary(line, LINE_BOUNDARY_MODULUS))):
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _chunk_scope(index, total, numbered=True):
+    # Consigne de découpage d'un morceau : seul le premier a une introduction
+    # et seul le dernier a une conclusion, pour que la fusion reste cohérente.
+    # Sans numérotation (mode incrémental), la consigne ne dépend pas de la
+    # position du morceau et reste identique si des morceaux sont ajoutés.
+    if numbered:
+        scope = f"Ce texte est la partie {index + 1} sur {total} du cours. Découpe cette partie en notions (Notion 1, Notion 2, ...)"
+    else:
+        scope = "Ce texte est une partie du cours. Découpe cette partie en notions (Notion 1, Notion 2, ...)"
+    if index == 0:
+        scope += ", précédées d'une Introduction du cours"
+    if index == total - 1:
+        scope += ", suivies d'une Conclusion du cours"
+    return scope + "."
+
+
+def _messages(prompt):
+    return [
+        SystemMessage(SYSTEM_PROMPT),
+        UserMessage(prompt),
+    ]
+
+
+def _parse_repaired(text, require_activities):
+    # Réponse à REPAIR_PROMPT : une ou plusieurs sections, toutes valides, ou
+    # tableau vide (élément sans équivalent dans le cours, abandonné)
+    if re.fullmatch(r"\[\s*\]", strip_code_fences(text).strip()):
+        return []
+    pieces = parse_sections(text, require_activities)
+    if not pieces or any(section is None for section, _, _ in pieces):
+        return None
+    return [section for section, _, _ in pieces]
+
+
+def repair_sections(parsed, sources, require_activities=False, use_cache=True):
+    # parsed : pour chaque réponse, ses éléments (section ou None, brut,
+    # erreurs) tels que renvoyés par parse_sections ; sources : le texte du
+    # cours envoyé pour chaque réponse. Les éléments invalides de toutes les
+    # réponses sont réparés en parallèle, chacun par sa propre requête ; un
+    # élément irréparable est abandonné. Renvoie, pour chaque réponse, ses
+    # sections dans l'ordre.
+    invalid = [(response_index, position) for response_index, pieces in enumerate(parsed)
+               for position, (section, _, _) in enumerate(pieces) if section is None]
+
+    repaired = {}
+    if invalid:
+        count("repair_requests", len(invalid))
+        section_format = EDUCATIONAL_SECTION_FORMAT if require_activities else SECTION_FORMAT
+        prompts = []
+        for response_index, position in invalid:
+            _, raw, errors = parsed[response_index][position]
+            prompts.append(REPAIR_PROMPT.format(content=sources[response_index], raw=raw,
+                                                errors="; ".join(errors), format=section_format))
+        with timed("repair"):
+            for index, response, error in iter_generate(
+                    prompts, use_cache, validate=lambda text: _parse_repaired(text, require_activities) is not None,
+                    attempts=REPAIR_MAX_ATTEMPTS):
+                if error is None:
+                    repaired[invalid[index]] = _parse_repaired(response, require_activities)
+                else:
+                    count("dropped_sections")
+
+    results = []
+    for response_index, pieces in enumerate(parsed):
+        sections = []
+        for position, (section, _, _) in enumerate(pieces):
+            if section is not None:
+                sections.append(section)
+            else:
+                sections += repaired.get((response_index, position), [])
+        results.append(sections)
+    return results
+
+
+def parse_responses(responses, sources, require_activities=False, use_cache=True):
+    # Sections valides de chaque réponse du modèle (sources : morceau du
+    # cours de chaque réponse), après réparation ciblée
+    return repair_sections([parse_sections(response, require_activities) for response in responses],
+                           sources, require_activities, use_cache)
+
+
+# Préfixe de numérotation des notions (« Notion 3 », « Notion 3 : Dérivées »)
+NOTION_PREFIX = re.compile(r"^Notion \d+\b\s*[:.\-–—]?\s*")
+
+
+def _merge_title(section):
+    # Titre comparé pour réunir deux sections : chaque morceau numérote ses
+    # notions à partir de 1, le numéro n'est donc pas significatif. Une notion
+    # sans intitulé après son numéro n'est jamais réunie.
+    title = str(section.get("section", "")).strip()
+    match = NOTION_PREFIX.match(title)
+    if match:
+        return title[match.end():].strip().lower() or None
+    return title.lower() or None
+
+
+def merge_sections(chunk_sections):
+    # Concatène les sections des morceaux dans l'ordre ; une notion coupée
+    # par une frontière de morceau (même intitulé de part et d'autre) est
+    # réunie en une seule section
+    merged = []
+    for sections in chunk_sections:
+        for section in sections:
+            previous = merged[-1] if merged else None
+            title = _merge_title(section)
+            if previous is not None and title is not None and _merge_title(previous) == title:
+                previous["summary"] = f"{previous.get('summary', '')} {section.get('summary', '')}".strip()
+                for field in ("related_elements", "qcm", "glossary", "flashcards"):
+                    if field in section:
+                        previous[field] = previous.get(field, []) + section[field]
+            else:
+                merged.append(dict(section))
+
+    # Renumérote les notions pour que la suite reste continue d'un morceau à l'autre
+    notion = 0
+    for section in merged:
+        if re.match(r"^Notion \d+\b", str(section.get("section", ""))):
+            notion += 1
+            section["section"] = re.sub(r"^Notion \d+", f"Notion {notion}", section["section"])
+    return merged
+
+
+def _response_key(prompt):
+    return response_key(prompt, system=SYSTEM_PROMPT, version=PROMPT_VERSION, model=model, **GENERATION_PARAMS)
+
+
+def iter_generate(prompts, use_cache=True, validate=None, attempts=1):
+    # Envoie les prompts au modèle en parallèle et produit (indice, réponse,
+    # erreur) dans l'ordre d'achèvement ; les réponses déjà obtenues pour le
+    # même contenu, gabarit et paramètres sont servies depuis le cache.
+    # Une requête en échec, ou une réponse rejetée par `validate`, est
+    # redemandée seule (jusqu'à `attempts` fois) sans retarder les autres ;
+    # seules les réponses acceptées sont mises en cache.
+    cache = get_response_cache() if use_cache else None
+    keys = [_response_key(prompt) for prompt in prompts]
+
+    pending = []
+    for index, key in enumerate(keys):
+        response = cache.get(key) if cache else None
+        if response is not None and (validate is None or validate(response)):
+            count("llm_cache_hits")
+            yield index, response, None
+        else:
+            pending.append(index)
+
+    errors = {}
+    for attempt in range(attempts):
+        if not pending:
+            return
+        if attempt:
+            count("llm_content_retries", len(pending))
+        failed = []
+        for position, response, error in complete_each([_messages(prompts[index]) for index in pending],
+                                                       **GENERATION_PARAMS):
+            index = pending[position]
+            if error is None and validate is not None and not validate(response):
+                error = ValueError("Réponse du modèle inexploitable")
+            if error is not None:
+                failed.append(index)
+                errors[index] = error
+                continue
+            if cache:
+                cache.put(keys[index], response, tokens=count_tokens(prompts[index]) + count_tokens(response))
+            yield index, response, None
+        pending = sorted(failed)
+
+    for index in pending:
+        yield index, None, errors[index]
+
+
+def generate(prompts, use_cache=True):
+    # Réponses dans l'ordre des prompts ; la première erreur interrompt l'ensemble
+    responses = [None] * len(prompts)
+    with timed("llm"):
+        for index, response, error in iter_generate(prompts, use_cache):
+            if error is not None:
+                raise error
+            responses[index] = response
+    return responses
+
+
+# Fonction pour demander au modèle GPT de structurer le contenu
+# En mode incrémental, le cours est découpé en morceaux stables
+# (split_into_stable_chunks) : après une modification du PDF, seuls les
+# morceaux dont le texte a changé sont renvoyés au modèle, les autres
+# réponses sont reprises du cache
+# require_activities : le gabarit demande aussi QCM, glossaire et flashcards
+# pour chaque section (validés, et réclamés lors des réparations)
+def ask_gpt_for_structure(content, prompt_template=STRUCTURE_PROMPT, max_chunk_tokens=MAX_CHUNK_TOKENS,
+                          use_cache=True, incremental=False, require_activities=False):
+    with track_document("structure"):
+        return _ask_gpt_for_structure(content, prompt_template, max_chunk_tokens, use_cache, incremental,
+                                      require_activities)
+
+
+def _split_for_structure(content, max_chunk_tokens, incremental):
+    with timed("chunking"):
+        if incremental:
+            return split_into_stable_chunks(content, min(max_chunk_tokens, INCREMENTAL_CHUNK_TOKENS))
+        return split_into_chunks(content, max_chunk_tokens)
+
+
+def _ask_gpt_for_structure(content, prompt_template, max_chunk_tokens, use_cache, incremental, require_activities):
+    chunks = _split_for_structure(content, max_chunk_tokens, incremental)
+    count("chunks", len(chunks))
+
+    # Un cours qui tient dans une requête est envoyé tel quel
+    if len(chunks) <= 1:
+        text = "\n".join(content) if isinstance(content, list) else content
+        response = generate([prompt_template.format(content=text, scope=FULL_DOCUMENT_SCOPE)], use_cache)[0]
+        return json.dumps(parse_responses([response], [text], require_activities, use_cache)[0], ensure_ascii=False)
+
+    # Map : chaque morceau est structuré séparément, en parallèle (dans la
+    # limite de concurrence du client)
+    prompts = [
+        prompt_template.format(content=chunk, scope=_chunk_scope(index, len(chunks), numbered=not incremental))
+        for index, chunk in enumerate(chunks)
+    ]
+    responses = generate(prompts, use_cache)
+    chunk_sections = parse_responses(responses, chunks, require_activities, use_cache)
+
+    # Reduce : fusion des sections dans l'ordre du cours
+    with timed("merge_sections"):
+        merged = merge_sections(chunk_sections)
+    return json.dumps(merged, ensure_ascii=False)
+
+
+def stream_structure(content, prompt_template=STRUCTURE_PROMPT, max_chunk_tokens=MAX_CHUNK_TOKENS, use_cache=True,
+                     incremental=False, require_activities=False):
+    # Variante en flux d'ask_gpt_for_structure : produit chaque section
+    # (dictionnaire) dès que son objet JSON est complet dans la réponse
+    return track_iter("structure", None,
+                      _stream_structure(content, prompt_template, max_chunk_tokens, use_cache, incremental,
+                                        require_activities))
+
+
+def _stream_structure(content, prompt_template, max_chunk_tokens, use_cache, incremental, require_activities=False):
+    chunks = _split_for_structure(content, max_chunk_tokens, incremental)
+
+    # Un cours découpé en morceaux est structuré en parallèle : les sections
+    # sont produites une fois la fusion faite
+    if len(chunks) > 1:
+        yield from json.loads(_ask_gpt_for_structure(content, prompt_template, max_chunk_tokens, use_cache,
+                                                     incremental, require_activities))
+        return
+    count("chunks")
+
+    text = "\n".join(content) if isinstance(content, list) else content
+    prompt = prompt_template.format(content=text, scope=FULL_DOCUMENT_SCOPE)
+    cache = get_response_cache() if use_cache else None
+    key = _response_key(prompt)
+
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        count("llm_cache_hits")
+    pieces = [cached] if cached is not None else stream(_messages(prompt), **GENERATION_PARAMS)
+
+    # Les sections valides sont produites au fil de l'eau ; à partir du
+    # premier élément invalide, les suivants sont retenus pour garder l'ordre
+    # du cours, le temps de la réparation
+    parser = JSONArrayStreamParser()
+    received = []
+    held = []
+    emitted = 0
+    for piece in pieces:
+        received.append(piece)
+        for raw in parser.feed_raw(piece):
+            checked = check_section(raw, require_activities)
+            if held or checked[0] is None:
+                held.append(checked)
+            else:
+                emitted += 1
+                yield checked[0]
+
+    response = "".join(received)
+    if cache and cached is None:
+        cache.put(key, response, tokens=count_tokens(prompt) + count_tokens(response))
+
+    if parser.pending.strip():
+        held.append((None, parser.pending, ["objet JSON tronqué"]))
+    elif not emitted and not held:
+        # Aucune section tirée du flux : la réponse entière est analysée
+        # (objet seul, tableau vide ou texte à réparer)
+        held = parse_sections(response, require_activities)
+    if held:
+        yield from repair_sections([held], [text], require_activities, use_cache)[0]
+
+
+def _parse_activities(text):
+    # Réponse de SECTION_ACTIVITIES_PROMPT : objet JSON avec les trois
+    # listes, validées comme celles d'une section (None si invalide)
+    text = strip_code_fences(text)
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end == -1:
+        return None
+    try:
+        activities = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return validate_activities(activities)[0]
+
+
+def stream_educational_content(content, max_chunk_tokens=MAX_CHUNK_TOKENS, use_cache=True, incremental=False,
+                               index=None, k=RETRIEVAL_TOP_K):
+    # Sections avec QCM, glossaire et flashcards, en deux étapes : le plan du
+    # cours, puis une requête par section. Une section dont la génération
+    # échoue garde son résumé, sans exercices et marquée "incomplete", sans
+    # faire échouer le cours. Les sections sont produites dans l'ordre du
+    # cours, dès que les précédentes sont prêtes.
+    # index : RetrievalIndex des pages du cours ; à défaut, construit sur `content`
+    return track_iter("structure", None,
+                      _stream_educational_content(content, max_chunk_tokens, use_cache, incremental, index, k))
+
+
+def _stream_educational_content(content, max_chunk_tokens, use_cache, incremental, index, k):
+    # Étape 1 : titres, résumés et éléments liés
+    with timed("outline"):
+        outline = list(_stream_structure(content, STRUCTURE_PROMPT, max_chunk_tokens, use_cache, incremental))
+    if not outline:
+        return
+
+    # Étape 2 : exercices de chaque section, à partir des passages pertinents
+    # (numéros de page cités seulement si le découpage en pages est connu)
+    label_pages = index is not None or isinstance(content, list)
+    if index is None:
+        index = get_retrieval_store().get_index(content if isinstance(content, list) else [content])
+    prompts = [
+        SECTION_ACTIVITIES_PROMPT.format(
+            section=section.get("section", ""), summary=section.get("summary", ""),
+            context=index.context(f"{section.get('section', '')}\n{section.get('summary', '')}", k, label_pages))
+        for section in outline
+    ]
+
+    ready = {}
+    next_index = 0
+    for position, response, error in iter_generate(prompts, use_cache, validate=lambda text: _parse_activities(text)
+                                                   is not None, attempts=SECTION_MAX_ATTEMPTS):
+        section = dict(outline[position])
+        if error is not None:
+            count("failed_sections")
+            section.update({field: [] for field in ACTIVITY_FIELDS}, incomplete=True)
+        else:
+            section.update(_parse_activities(response))
+        ready[position] = section
+        while next_index in ready:
+            yield ready.pop(next_index)
+            next_index += 1
+
+
+def answer_question(question, index, k=RETRIEVAL_TOP_K, use_cache=True):
+    # index : RetrievalIndex des pages du cours (utils.retrieval)
+    with track_document("question"):
+        context = index.context(question, k)
+        return generate([QUESTION_PROMPT.format(context=context, question=question)], use_cache)[0]